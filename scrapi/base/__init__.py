@@ -4,14 +4,15 @@ from __future__ import unicode_literals
 import abc
 import time
 import logging
+from collections import defaultdict
 from dateutil.parser import parse
 from datetime import date, timedelta
 
-import requests
 from lxml import etree
-from nameparser import HumanName
 
 from scrapi import util
+from scrapi import settings
+from scrapi import requests
 from scrapi.linter import lint
 from scrapi.linter.document import RawDocument, NormalizedDocument
 
@@ -40,6 +41,78 @@ class BaseHarvester(object):
         return lint(self.harvest, self.normalize)
 
 
+def child_nodes(element):
+    """ The same nodes as element's node() axis, in document order,
+    with child elements serialized. Only plain strings are returned,
+    as any element would keep its whole tree alive.
+    """
+    if element.text:
+        yield element.text
+    for child in element:
+        yield etree.tostring(child, encoding=unicode, with_tail=False)
+        if child.tail:
+            yield child.tail
+
+
+class OAIRecord(object):
+    """ The contents of every element in an OAI record, bucketed by tag
+    in a single pass over the record. Each of OAIHarvester's get_* methods
+    is then a lookup rather than another search through the record.
+
+    Only elements holding nothing but text are bucketed up front. Those
+    with child elements, most of them wrappers nobody asks for, are
+    serialized the first time their tag is asked for.
+
+    Given the record's serialized doc, the record is not kept around, so
+    that an OAIRecord does not keep alive the page the record came from.
+    """
+
+    def __init__(self, root, namespaces, doc=None):
+        self._root = root
+        self.doc = doc
+        self.namespaces = namespaces
+        self.status = None
+        self.nodes = defaultdict(list)
+        self.mixed = set()  # Tags of elements with child elements
+
+        header = '{{{}}}header'.format(namespaces['ns0'])
+        for element in root.iterdescendants():
+            if not isinstance(element.tag, basestring):
+                continue  # Comments and processing instructions
+            if element.tag == header:
+                self.status = element.get('status')
+            if len(element):
+                self.mixed.add(element.tag)
+            elif element.text:
+                self.nodes[element.tag].append(element.text)
+
+        if doc is not None:
+            self._root = None
+
+    @property
+    def root(self):
+        if self._root is None:
+            self._root = etree.XML(self.doc)
+        return self._root
+
+    def get(self, prefix, name):
+        """ Equivalent to evaluating './/prefix:name/node()' on the record,
+        except that element nodes come back serialized """
+        tag = '{{{}}}{}'.format(self.namespaces[prefix], name)
+
+        if tag in self.mixed:
+            self.mixed.discard(tag)
+            self.nodes[tag] = [
+                node for element in self.root.iterdescendants(tag)
+                for node in child_nodes(element)
+            ]
+
+        return list(self.nodes.get(tag, []))
+
+    def xpath(self, *args, **kwargs):
+        return self.root.xpath(*args, **kwargs)
+
+
 class OAIHarvester(BaseHarvester):
     """ Create a harvester with a oai_dc namespace, that will harvest
     documents within a certain date range
@@ -64,6 +137,14 @@ class OAIHarvester(BaseHarvester):
 
     DEFAULT_ENCODING = 'UTF-8'
 
+    # Compiled once per harvester, see compile_xpaths. Records
+    # themselves are read through OAIRecord when normalizing
+    XPATHS = {
+        'records': '//ns0:record',
+        'token': '//ns0:resumptionToken/node()',
+        'identifier': 'ns0:header/ns0:identifier',
+    }
+
     record_encoding = None
 
     def __init__(self, name, base_url, timezone_granularity=False, timeout=0.5, property_list=None, approved_sets=None):
@@ -73,8 +154,20 @@ class OAIHarvester(BaseHarvester):
         self.approved_sets = approved_sets
         self.timeout = timeout
         self.timezone_granularity = timezone_granularity
+        self.xpaths = self.compile_xpaths(self.XPATHS)
+
+    def compile_xpaths(self, expressions):
+        return {
+            name: etree.XPath(expression, namespaces=self.NAMESPACES)
+            for name, expression in expressions.items()
+        }
 
     def harvest(self, days_back=1):
+        return list(self.iter_harvest(days_back=days_back))
+
+    def iter_harvest(self, days_back=1):
+        """ Lazily yields a RawDocument for every record harvested since
+        days_back, one resumption page at a time. """
 
         start_date = str(date.today() - timedelta(int(days_back)))
 
@@ -84,79 +177,78 @@ class OAIHarvester(BaseHarvester):
         if self.timezone_granularity:
             request_url += 'T00:00:00Z'
 
-        records = self.get_records(request_url, start_date)
-
-        rawdoc_list = []
-        for record in records:
-            doc_id = record.xpath(
-                'ns0:header/ns0:identifier', namespaces=self.NAMESPACES)[0].text
-            record = etree.tostring(record, encoding=self.record_encoding)
-            rawdoc_list.append(RawDocument({
-                'doc': record,
+        for record in self.iter_records(request_url, start_date):
+            doc_id = self.xpaths['identifier'](record)[0].text
+            doc = etree.tostring(record, encoding=self.record_encoding)
+            raw = RawDocument({
+                'doc': doc,
                 'source': util.copy_to_unicode(self.name),
                 'docID': util.copy_to_unicode(doc_id),
                 'filetype': 'xml'
-            }))
+            })
+
+            # Normalizing in this process can use the record we already parsed
+            if getattr(settings, 'CELERY_ALWAYS_EAGER', False):
+                raw.parsed = self.extract(record, doc=doc)
 
-        return rawdoc_list
+            yield raw
 
     def get_records(self, url, start_date, resump_token=''):
-        logger.info('Requesting url for harvesting: {}'.format(url))
-        data = requests.get(url)
-
-        doc = etree.XML(data.content)
-
-        records = doc.xpath(
-            '//ns0:record',
-            namespaces=self.NAMESPACES
-        )
-        token = doc.xpath(
-            '//ns0:resumptionToken/node()',
-            namespaces=self.NAMESPACES
-        )
-        if len(token) == 1:
+        return list(self.iter_records(url, start_date, resump_token=resump_token))
+
+    def iter_records(self, url, start_date, resump_token=''):
+        """ Yields every record element from url, following resumption
+        tokens until the provider runs out of pages.
+
+        Only the page currently being yielded from is kept in memory, once
+        the caller moves on to the next page the previous tree is released.
+        """
+        while True:
+            logger.info('Requesting url for harvesting: {}'.format(url))
+            data = requests.get(url)
+
+            doc = etree.XML(data.content)
+
+            records = self.xpaths['records'](doc)
+            token = self.xpaths['token'](doc)
+
+            for record in records:
+                yield record
+
+            # Drop our references to the page so lxml can free it
+            del doc, records
+
+            if len(token) != 1:
+                return
+
             time.sleep(self.timeout)
             base_url = url.replace(
                 self.META_PREFIX_DATE.format(start_date), '')
             base_url = base_url.replace(self.RESUMPTION + resump_token, '')
-            url = base_url + self.RESUMPTION + token[0]
-            records += self.get_records(url, start_date, resump_token=token[0])
+            resump_token = token[0]
+            url = base_url + self.RESUMPTION + resump_token
 
-        return records
+    def extract(self, record, doc=None):
+        return OAIRecord(record, self.NAMESPACES, doc=doc)
 
     def get_contributors(self, result):
         """ this grabs all of the fields marked contributors
         or creators in the OAI namespaces """
 
-        contributors = result.xpath(
-            '//dc:contributor/node()',
-            namespaces=self.NAMESPACES
-        )
-        creators = result.xpath(
-            '//dc:creator/node()',
-            namespaces=self.NAMESPACES
-        )
+        contributors = result.get('dc', 'contributor')
+        creators = result.get('dc', 'creator')
 
         all_contributors = contributors + creators
 
         contributor_list = []
         for person in all_contributors:
-            name = HumanName(person)
-            contributor = {
-                'prefix': name.title,
-                'given': name.first,
-                'middle': name.middle,
-                'family': name.last,
-                'suffix': name.suffix,
-                'email': '',
-                'ORCID': ''
-            }
+            contributor = util.parse_contributor(person)
             contributor_list.append(contributor)
 
         return contributor_list
 
     def get_tags(self, result):
-        tags = result.xpath('//dc:subject/node()', namespaces=self.NAMESPACES)
+        tags = result.get('dc', 'subject')
 
         for tag in tags:
             if ', ' in tag:
@@ -174,8 +266,7 @@ class OAIHarvester(BaseHarvester):
         in the url field
         """
         serviceID = doc.get('docID')
-        identifiers = result.xpath(
-            '//dc:identifier/node()', namespaces=self.NAMESPACES)
+        identifiers = result.get('dc', 'identifier')
         url = ''
         doi = ''
         for item in identifiers:
@@ -205,51 +296,34 @@ class OAIHarvester(BaseHarvester):
 
         properties = {}
         for item in property_list:
-            prop = result.xpath(
-                '//dc:{}/node()'.format(item),
-                namespaces=self.NAMESPACES
-            )
-            prop.extend(result.xpath(
-                '//ns0:{}/node()'.format(item),
-                namespaces=self.NAMESPACES
-            ))
+            prop = result.get('dc', item)
+            prop.extend(result.get('ns0', item))
 
             properties[item] = [util.copy_to_unicode(element) for element in prop]
 
         return properties
 
     def get_date_updated(self, result):
-        dateupdated = result.xpath(
-            '//ns0:header/ns0:datestamp/node()',
-            namespaces=self.NAMESPACES
-        )
+        dateupdated = result.get('ns0', 'datestamp')
         date_updated = parse(dateupdated[0]).isoformat()
         return util.copy_to_unicode(date_updated)
 
     def get_title(self, result):
-        title = result.xpath(
-            '//dc:title/node()',
-            namespaces=self.NAMESPACES
-        ) or ['']
+        title = result.get('dc', 'title') or ['']
         return util.copy_to_unicode(title[0])
 
     def get_description(self, result):
-        description = result.xpath(
-            '//dc:description/node()',
-            namespaces=self.NAMESPACES
-        ) or ['']
+        description = result.get('dc', 'description') or ['']
 
         return util.copy_to_unicode(description[0])
 
     def normalize(self, raw_doc):
-        str_result = raw_doc.get('doc')
-        result = etree.XML(str_result)
+        result = getattr(raw_doc, 'parsed', None)
+        if not isinstance(result, OAIRecord):
+            result = self.extract(etree.XML(raw_doc.get('doc')))
 
         if self.approved_sets:
-            set_spec = result.xpath(
-                'ns0:header/ns0:setSpec/node()',
-                namespaces=self.NAMESPACES
-            )
+            set_spec = result.get('ns0', 'setSpec')
             # check if there's an intersection between the approved sets and the
             # setSpec list provided in the record. If there isn't, don't normalize.
             if not {x.replace('publication:', '') for x in set_spec}.intersection(self.approved_sets):
@@ -267,8 +341,7 @@ class OAIHarvester(BaseHarvester):
             'dateUpdated': self.get_date_updated(result)
         }
 
-        status = result.xpath('ns0:header/@status', namespaces=self.NAMESPACES)
-        if status and status[0] == 'deleted':
+        if result.status == 'deleted':
             logger.info('Deleted record, not normalizing {}'.format(normalized['id']['serviceID']))
             return None
 
@@ -0,0 +1,206 @@
+"""Normalization benchmarks over harvests recorded with RECORD_HTTP_TRANSACTIONS.
+
+Each harvester's latest cassette in RECORD_DIRECTORY is replayed to harvest
+offline, then every record is normalized repeat times. The results are
+records/sec (from the fastest run), peak memory and the functions normalize
+spent the most time in. Each harvester is benchmarked in a process of its
+own, so that its peak memory is not the most an earlier one used. They are saved as JSON in BENCHMARK_DIRECTORY so
+that runs on different commits can be compared.
+"""
+
+from __future__ import absolute_import
+
+import os
+import re
+import json
+import glob
+import time
+import pstats
+import cProfile
+import resource
+import platform
+import subprocess
+import multiprocessing
+from contextlib import contextmanager
+
+import vcr
+
+from scrapi import util
+from scrapi import settings
+
+
+# Harvests ask for records since some date, ignore dates when matching requests
+DATE = re.compile(r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?')
+
+
+def undated_uri(r1, r2):
+    return DATE.sub('', r1.uri) == DATE.sub('', r2.uri)
+
+
+replay = vcr.VCR(record_mode='none', match_on=('method', 'undated_uri'))
+replay.register_matcher('undated_uri', undated_uri)
+
+
+# :: Str -> Maybe Str
+def latest_cassette(harvester_name):
+    # Cassettes are named by the timestamp they were recorded at
+    cassettes = sorted(glob.glob(os.path.join(settings.RECORD_DIRECTORY, harvester_name, '*.yml')))
+    return cassettes[-1] if cassettes else None
+
+
+# :: Int
+def peak_memory():
+    ''' The most memory this process has used, in kilobytes. Forked
+    processes start from their parent's memory at the time of the fork
+    '''
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# :: Maybe Str
+def commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=open(os.devnull, 'w')
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextmanager
+def worker_harvest():
+    ''' Harvest as a worker does, without parsed records being
+    handed to normalize in-process, see OAIHarvester.iter_harvest
+    '''
+    eager = settings.CELERY_ALWAYS_EAGER
+    settings.CELERY_ALWAYS_EAGER = False
+    try:
+        yield
+    finally:
+        settings.CELERY_ALWAYS_EAGER = eager
+
+
+# :: pstats.Stats -> Int -> Bool -> [Dict]
+def hotspots(stats, limit, cumulative=False):
+    ''' The limit functions that took the most time of their own,
+    or the most time including what they called when cumulative
+    '''
+    functions = sorted(stats.stats.items(), key=lambda item: item[1][3 if cumulative else 2], reverse=True)
+
+    return [
+        {
+            'function': '{}:{}({})'.format(filename, line, name),
+            'calls': calls,
+            'tottime': tottime,
+            'cumtime': cumtime,
+        }
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in functions[:limit]
+    ]
+
+
+# :: Module -> Str -> Int -> Int -> Int -> Dict
+def benchmark_harvester(harvester, cassette, days_back=1, repeat=3, limit=20):
+    memory = peak_memory()
+
+    start = time.time()
+    with worker_harvest(), replay.use_cassette(cassette):
+        raw_docs = list(harvester.harvest(days_back=days_back))
+    harvest_time = time.time() - start
+
+    runs = []
+    for _ in range(repeat):
+        # Each run starts as cold as a fresh worker would
+        util.name_cache.clear()
+        start = time.time()
+        normalized = [harvester.normalize(raw) for raw in raw_docs]
+        runs.append(time.time() - start)
+
+    fastest = min(runs) if runs else None
+    result = {
+        'cassette': cassette,
+        'records': len(raw_docs),
+        'normalized': len(filter(None, normalized)) if runs else None,
+        'harvestSeconds': harvest_time,
+        'normalizeSeconds': runs,
+        'recordsPerSecond': len(raw_docs) / fastest if fastest else None,
+        'peakMemory': peak_memory(),
+        'memoryGrowth': peak_memory() - memory,
+    }
+
+    if limit:
+        util.name_cache.clear()
+        profile = cProfile.Profile()
+        profile.enable()
+        for raw in raw_docs:
+            harvester.normalize(raw)
+        profile.disable()
+        result['hotspots'] = hotspots(pstats.Stats(profile), limit)
+
+    return result
+
+
+# :: [Str] -> Int -> Int -> Int -> Dict
+def run(harvester_names, days_back=1, repeat=3, limit=20):
+    results = {
+        'commit': commit(),
+        'created': util.timestamp(),
+        'python': platform.python_version(),
+        'harvesters': {}
+    }
+
+    for name in harvester_names:
+        cassette = latest_cassette(name)
+        if not cassette:
+            results['harvesters'][name] = {'skipped': 'No recorded harvest in {}'.format(settings.RECORD_DIRECTORY)}
+            continue
+
+        results['harvesters'][name] = benchmark_isolated(
+            name, cassette, days_back=days_back, repeat=repeat, limit=limit
+        )
+
+    return results
+
+
+# :: Str -> Str -> Dict
+def benchmark_isolated(harvester_name, cassette, **kwargs):
+    ''' benchmark_harvester, run in a fresh child process '''
+    pool = multiprocessing.Pool(1)
+    try:
+        return pool.apply(benchmark_by_name, (harvester_name, cassette), kwargs)
+    finally:
+        pool.terminate()
+
+
+def benchmark_by_name(harvester_name, cassette, **kwargs):
+    return benchmark_harvester(util.import_harvester(harvester_name), cassette, **kwargs)
+
+
+# :: Dict -> Maybe Str -> Str
+def save(results, prefix=None):
+    util.make_dir(settings.BENCHMARK_DIRECTORY)
+    filename = '{}-{}.json'.format(results['created'], (results['commit'] or 'unknown')[:8])
+    path = os.path.join(settings.BENCHMARK_DIRECTORY, '-'.join(filter(None, [prefix, filename])))
+
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=4, sort_keys=True)
+
+    return path
+
+
+# :: Dict -> Dict -> Dict
+def compare(old, new):
+    ''' The records/sec of every harvester in both results, and the change
+    from old to new as a fraction, negative for a regression
+    '''
+    changes = {}
+    for name, result in new['harvesters'].items():
+        before = old['harvesters'].get(name, {}).get('recordsPerSecond')
+        after = result.get('recordsPerSecond')
+        if before and after:
+            changes[name] = {
+                'before': before,
+                'after': after,
+                'change': after / before - 1
+            }
+    return changes
@@ -14,12 +14,16 @@ from scrapi import settings
 logger = logging.getLogger(__name__)
 
 
+def cassandra_required():
+    return settings.RECORD_HTTP_TRANSACTIONS or 'cassandra' in settings.NORMALIZED_PROCESSING or 'cassandra' in settings.RAW_PROCESSING
+
+
 try:
     connection.setup(settings.CASSANDRA_URI, settings.CASSANDRA_KEYSPACE)
     management.create_keyspace(settings.CASSANDRA_KEYSPACE, replication_factor=1, strategy_class='SimpleStrategy')
 except NoHostAvailable:
     logger.error('Could not connect to Cassandra, expect errors.')
-    if settings.RECORD_HTTP_TRANSACTIONS or 'cassandra' in settings.NORMALIZED_PROCESSING or 'cassandra' in settings.RAW_PROCESSING:
+    if cassandra_required():
         raise
 
 
@@ -28,6 +32,11 @@ def cassandra_init(*args, **kwargs):
         connection.cluster.shutdown()
     if connection.session is not None:
         connection.session.shutdown()
-    connection.setup(settings.CASSANDRA_URI, settings.CASSANDRA_KEYSPACE)
+    try:
+        connection.setup(settings.CASSANDRA_URI, settings.CASSANDRA_KEYSPACE)
+    except NoHostAvailable:
+        logger.error('Could not connect to Cassandra, expect errors.')
+        if cassandra_required():
+            raise
 
 worker_process_init.connect(cassandra_init)
@@ -0,0 +1,252 @@
+"""Buffered delivery of events to fluentd.
+
+Events are queued in memory and a background thread hands them to the
+fluentd sender in batches, so dispatching an event never waits on the
+network. The queue is bounded, when it is full events are dropped or the
+caller waits, depending on FLUENTD_OVERFLOW. Whatever is still queued is
+flushed when the process or celery worker process exits.
+"""
+
+from __future__ import absolute_import
+
+import os
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+
+from fluent import sender
+from celery.signals import worker_process_shutdown
+
+from scrapi import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Overflow policies
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+
+_emitter = None
+
+
+# :: Maybe BufferedEmitter
+def get_emitter():
+    global _emitter
+
+    if not settings.FLUENTD_BUFFERED:
+        return None
+
+    if _emitter is None:
+        _emitter = BufferedEmitter(
+            sender.get_global_sender(),
+            maxsize=settings.FLUENTD_QUEUE_SIZE,
+            batch_size=settings.FLUENTD_BATCH_SIZE,
+            interval=settings.FLUENTD_FLUSH_INTERVAL,
+            overflow=settings.FLUENTD_OVERFLOW,
+            block_timeout=settings.FLUENTD_BLOCK_TIMEOUT
+        )
+        atexit.register(_emitter.close)
+
+    return _emitter
+
+
+def shutdown(*args, **kwargs):
+    ''' Worker processes exit without running atexit handlers '''
+    if _emitter is not None:
+        _emitter.close()
+
+worker_process_shutdown.connect(shutdown)
+
+
+class BufferedEmitter(object):
+    ''' Queues (label, timestamp, data) events and sends them through
+    sender, batch_size at a time or every interval seconds, from a
+    background thread started on the first emit in each process.
+    '''
+
+    def __init__(self, sender, maxsize=10000, batch_size=100, interval=1.0,
+                 overflow=DROP_NEWEST, block_timeout=1.0):
+        if overflow not in (DROP_NEWEST, DROP_OLDEST, BLOCK):
+            raise ValueError('Unknown overflow policy "{}"'.format(overflow))
+
+        self.sender = sender
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.interval = interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.sending = 0  # Events taken off the queue but not yet sent
+        self.pending = 0  # Events the sender is holding on to, to retry
+        self.flushing = 0  # Callers waiting on flush, partial batches go out
+        self.closed = False
+        self.thread = None
+        self.pid = None
+
+        self.emitted = 0
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+
+    # :: Nothing
+    def _ensure_thread(self):
+        # Threads do not survive forking into worker processes
+        if self.pid != os.getpid():
+            self.queue.clear()
+            self.sending = 0
+            self.pending = 0
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self._run, name='fluentd-emitter')
+            self.thread.daemon = True
+            self.thread.start()
+
+    # :: Str -> Int -> Dict -> Bool
+    def emit(self, label, timestamp, data):
+        ''' Queues an event, returns False if it had to be dropped '''
+        with self.condition:
+            if self.closed:
+                self.dropped += 1
+                return False
+
+            self._ensure_thread()
+
+            if len(self.queue) >= self.maxsize:
+                if self.overflow == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                elif self.overflow == DROP_OLDEST:
+                    self.queue.popleft()
+                    self.dropped += 1
+                else:
+                    deadline = time.time() + self.block_timeout
+                    while len(self.queue) >= self.maxsize and time.time() < deadline:
+                        self.condition.wait(deadline - time.time())
+                    if len(self.queue) >= self.maxsize:
+                        self.dropped += 1
+                        return False
+
+            self.queue.append((label, timestamp, data))
+            self.emitted += 1
+
+            if len(self.queue) >= self.batch_size:
+                self.condition.notify_all()
+
+        return True
+
+    # :: [(Str, Int, Dict)] -> Nothing
+    def send(self, batch):
+        for label, timestamp, data in batch:
+            try:
+                self.sender.emit_with_time(label, timestamp, data)
+            except Exception:
+                logger.exception('Failed to send an event to fluentd')
+                with self.condition:
+                    self.failed += 1
+            else:
+                self._sent()
+
+    def _sent(self):
+        ''' The sender never raises, so what became of an event is read
+        off it afterwards. On a failed send it closes its socket and keeps
+        the unsent bytes in pendings to retry with the next event, unless
+        they have outgrown bufmax, in which case they are thrown away.
+        '''
+        with self.condition:
+            if self.sender.socket is not None:
+                self.sent += self.pending + 1
+                self.pending = 0
+            elif self.sender.pendings:
+                self.pending += 1
+            else:
+                logger.error('fluentd is unreachable, lost {} events'.format(self.pending + 1))
+                self.failed += self.pending + 1
+                self.pending = 0
+
+    # :: Bool -> [(Str, Int, Dict)]
+    def _take(self, wait=True):
+        with self.condition:
+            deadline = time.time() + self.interval
+            while wait and not (self.closed or self.flushing) and len(self.queue) < self.batch_size and time.time() < deadline:
+                self.condition.wait(deadline - time.time())
+
+            batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+            self.sending += len(batch)
+            # Wake up anyone blocked on a full queue or waiting on a flush
+            self.condition.notify_all()
+            return batch
+
+    def _done(self, batch):
+        with self.condition:
+            self.sending -= len(batch)
+            self.condition.notify_all()
+
+    def _run(self):
+        pid = os.getpid()
+        while self.pid == pid:
+            batch = self._take()
+            if batch:
+                self.send(batch)
+                self._done(batch)
+            elif self.closed:
+                return
+
+    # :: Maybe Float -> Bool
+    def flush(self, timeout=None):
+        ''' Waits until everything queued so far has been sent,
+        returns False if that took longer than timeout seconds
+        '''
+        deadline = timeout is not None and time.time() + timeout
+
+        with self.condition:
+            self.flushing += 1
+            self.condition.notify_all()
+            try:
+                while self.queue or self.sending:
+                    if self.thread is None or not self.thread.is_alive() or self.pid != os.getpid():
+                        break
+                    remaining = deadline and deadline - time.time()
+                    if deadline and remaining <= 0:
+                        return False
+                    self.condition.wait(remaining or self.interval)
+            finally:
+                self.flushing -= 1
+
+        # Without a running thread, send what is left from here
+        while True:
+            batch = self._take(wait=False)
+            if not batch:
+                return True
+            self.send(batch)
+            self._done(batch)
+
+    # :: Nothing
+    def close(self, timeout=None):
+        ''' Flushes and stops the background thread, later events are dropped '''
+        self.flush(settings.FLUENTD_SHUTDOWN_TIMEOUT if timeout is None else timeout)
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+            # Nothing is left to carry whatever the sender holds on to
+            if self.pending:
+                logger.error('fluentd is unreachable, lost {} events'.format(self.pending))
+                self.failed += self.pending
+                self.pending = 0
+
+    # :: Dict
+    def stats(self):
+        with self.condition:
+            return {
+                'queued': len(self.queue),
+                'pending': self.pending,
+                'emitted': self.emitted,
+                'sent': self.sent,
+                'dropped': self.dropped,
+                'failed': self.failed
+            }
@@ -1,5 +1,6 @@
 from __future__ import unicode_literals
 
+import time
 import logging
 import inspect
 from functools import wraps
@@ -7,6 +8,8 @@ from functools import wraps
 from fluent import event
 
 from scrapi import settings
+from scrapi.emitter import get_emitter
+from scrapi.linter.document import BaseDocument
 
 
 logger = logging.getLogger(__name__)
@@ -25,6 +28,14 @@ STARTED = 'started'
 COMPLETED = 'completed'
 
 
+# Arguments longer than this are left out of events
+MAX_CONTEXT_LENGTH = 256
+CONTEXT_SCALARS = (int, long, float, bool, type(None))
+
+# Returned by condense for values not worth sending
+OMIT = object()
+
+
 class Skip(Exception):
     pass
 
@@ -63,14 +74,27 @@ def dispatch(_event, status, _index=None, **kwargs):
         _event = '{}.{}'.format(_event, _index)
 
     logger.info('[{}][{}]{!r}'.format(_event, status, kwargs))
-    event.Event(_event, evnt)
+
+    emitter = get_emitter()
+    if emitter:
+        emitter.emit(_event, int(time.time()), evnt)
+    else:
+        event.Event(_event, evnt)
 
 
 def logged(event, index=None):
     def _logged(func):
+        signature = get_signature(func)
+
         @wraps(func)
         def wrapped(*args, **kwargs):
-            context = extract_context(func, *args, **kwargs)
+            if not settings.USE_FLUENTD:
+                try:
+                    return func(*args, **kwargs)
+                except Skip:
+                    return None
+
+            context = extract_context(signature, args, kwargs)
             dispatch(event, STARTED, _index=index, **context)
             try:
                 res = func(*args, **kwargs)
@@ -83,45 +107,90 @@ def logged(event, index=None):
             else:
                 dispatch(event, COMPLETED, _index=index, **context)
             return res
+        wrapped._signature = signature
         return wrapped
     return _logged
 
 
-def extract_context(func, *args, **kwargs):
-    args = list(reversed(args))
+def get_signature(func):
+    """ The parts of func's argspec that extract_context needs,
+    worked out once when func is decorated. Decorated functions carry
+    the signature of the function they wrap rather than their own """
+    if hasattr(func, '_signature'):
+        return func._signature
+
     arginfo = inspect.getargspec(func)
+    defaults = arginfo.defaults or ()
+    kwarg_names = arginfo.args[len(arginfo.args) - len(defaults):]
 
-    if arginfo.defaults:
-        arg_names = arginfo.args[:len(arginfo.defaults)]
-        kwarg_names = arginfo.args[len(arginfo.defaults):]
-    else:
-        kwarg_names = []
-        arg_names = arginfo.args
+    return arginfo.args, dict(zip(kwarg_names, defaults)), arginfo.varargs, arginfo.keywords
 
-    real_args = {
-        key: kwargs.pop(key, val)
-        for key, val
-        in zip(kwarg_names, arginfo.defaults or [])
-    }
 
-    for name in arg_names:
-        real_args[name] = args.pop()
+def extract_context(signature, args, kwargs):
+    """ The arguments func was called with, by name, condensed for events.
+    Documents are reduced to their docID, large values are left out """
+    arg_names, defaults, varargs, keywords = signature
+    context = {}
+
+    for name, value in zip(arg_names, args):
+        add_context(context, name, value)
+
+    for name in arg_names[len(args):]:
+        add_context(context, name, kwargs.get(name, defaults.get(name)))
 
-    if arginfo.varargs:
-        real_args[arginfo.varargs] = list(reversed(args))
+    if varargs:
+        add_context(context, varargs, list(args[len(arg_names):]))
 
-    if arginfo.keywords:
-        real_args[arginfo.keywords] = kwargs
+    if keywords:
+        add_context(context, keywords, {
+            key: value for key, value in kwargs.items()
+            if key not in arg_names
+        })
 
-    return real_args
+    return context
+
+
+def add_context(context, name, value):
+    if isinstance(value, BaseDocument):
+        doc_id = value.get('docID') or (value.get('id') or {}).get('serviceID')
+        if doc_id:
+            context.setdefault('docID', doc_id)
+        return
+
+    value = condense(value)
+    if value is not OMIT:
+        context[name] = value
+
+
+def condense(value, depth=0):
+    if isinstance(value, CONTEXT_SCALARS):
+        return value
+
+    if isinstance(value, basestring):
+        return value if len(value) <= MAX_CONTEXT_LENGTH else OMIT
+
+    if depth > 2 or not isinstance(value, (list, tuple, dict)) or len(value) > MAX_CONTEXT_LENGTH:
+        return OMIT
+
+    if isinstance(value, dict):
+        condensed = {key: condense(item, depth + 1) for key, item in value.items()}
+        values = condensed.values()
+    else:
+        values = condensed = [condense(item, depth + 1) for item in value]
+
+    return OMIT if OMIT in values else condensed
 
 
 def creates_task(event):
     def _creates_task(func):
+        signature = get_signature(func)
+
         @wraps(func)
         def wrapped(*args, **kwargs):
             res = func(*args, **kwargs)
-            dispatch(event, CREATED, **extract_context(func, *args, **kwargs))
+            if settings.USE_FLUENTD:
+                dispatch(event, CREATED, **extract_context(signature, args, kwargs))
             return res
+        wrapped._signature = signature
         return wrapped
     return _creates_task
@@ -19,4 +19,5 @@ arxiv_oai = OAIHarvester(
 )
 
 harvest = arxiv_oai.harvest
+iter_harvest = arxiv_oai.iter_harvest
 normalize = arxiv_oai.normalize
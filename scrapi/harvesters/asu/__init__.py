@@ -22,4 +22,5 @@ asu = OAIHarvester(
 )
 
 harvest = asu.harvest
+iter_harvest = asu.iter_harvest
 normalize = asu.normalize
@@ -137,4 +137,5 @@ calpoly = OAIHarvester(
 )
 
 harvest = calpoly.harvest
+iter_harvest = calpoly.iter_harvest
 normalize = calpoly.normalize
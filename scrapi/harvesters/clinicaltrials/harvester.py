@@ -7,17 +7,18 @@ from __future__ import unicode_literals
 
 import time
 import datetime
-
-import requests
+import threading
+from multiprocessing.pool import ThreadPool
 
 from lxml import etree
 
 from dateutil.parser import *
 
-from nameparser import HumanName
-
+from scrapi import settings
+from scrapi import requests
 from scrapi.linter import lint
 from scrapi.linter.document import RawDocument, NormalizedDocument
+from scrapi.util import parse_contributor
 
 NAME = "clinicaltrials"
 
@@ -35,6 +36,56 @@ def copy_to_unicode(element):
         return unicode(element, encoding=encoding)
 
 
+class RateLimiter(object):
+    """ Spaces out calls to wait across all threads so that
+    no more than rate of them return each second """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_call = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.time()
+            delay = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def fetch(limiter, url):
+    """ Gets url once the limiter allows it, scrapi.requests retries
+    any failures. Returns None if the study could not be fetched """
+    limiter.wait()
+    try:
+        response = requests.get(url)
+    except requests.exceptions.RequestException as e:
+        print('Giving up on {}: {}'.format(url, e))
+        return None
+    if response.status_code in requests.RETRY_STATUSES:
+        print('Giving up on {}: got a {}'.format(url, response.status_code))
+        return None
+    return response
+
+
+def parse_study(response, encoding):
+    """ The RawDocument of a fetched study, or None if it is not a study """
+    try:
+        doc = etree.XML(response.content)
+        doc_id = doc.xpath('//nct_id/node()')[0]
+    except (etree.XMLSyntaxError, IndexError) as e:
+        print('Skipping {}: {}'.format(response.url, e))
+        return None
+
+    return RawDocument({
+        'doc': etree.tostring(doc, encoding=encoding),
+        'source': NAME,
+        'docID': copy_to_unicode(doc_id),
+        'filetype': 'xml',
+    })
+
+
 def harvest(days_back=1):
     """ First, get a list of all recently updated study urls,
     then get the xml one by one and save it into a list
@@ -76,30 +127,26 @@ def harvest(days_back=1):
 
         # grab each of those urls for full content
         print("There are {} urls to harvest - be patient...".format(len(study_urls)))
-        count = 0
-        official_count = 0
-        for study_url in study_urls:
-            try:
-                content = requests.get(study_url)
-            except requests.exceptions.ConnectionError as e:
-                print('Connection error: {}, wait a bit...'.format(e))
-                time.sleep(30)
-                continue
-            doc = etree.XML(content.content)
-            record = etree.tostring(doc, encoding=record_encoding)
-            doc_id = doc.xpath('//nct_id/node()')[0]
-            xml_list.append(RawDocument({
-                'doc': record,
-                'source': NAME,
-                'docID': copy_to_unicode(doc_id),
-                'filetype': 'xml',
-            }))
-            official_count += 1
-            count += 1
-            if count % 100 == 0:
-                print("You've requested {} studies, keep going!".format(official_count))
-                count = 0
-            time.sleep(1)
+        limiter = RateLimiter(settings.CLINICALTRIALS_RATE)
+
+        pool = ThreadPool(settings.CLINICALTRIALS_WORKERS)
+        try:
+            # imap keeps the studies in order while up to CLINICALTRIALS_WORKERS are in flight
+            contents = pool.imap(lambda study_url: fetch(limiter, study_url), study_urls)
+            for official_count, content in enumerate(contents, 1):
+                raw = None if content is None else parse_study(content, record_encoding)
+                if raw is not None:
+                    xml_list.append(raw)
+                if official_count % 100 == 0:
+                    print("You've requested {} studies, keep going!".format(official_count))
+        except BaseException:
+            # Nothing would be left to use what the workers go on to fetch
+            pool.terminate()
+            raise
+        else:
+            pool.close()
+        finally:
+            pool.join()
 
     return xml_list
 
@@ -109,16 +156,7 @@ def get_contributors(xml_doc):
     #TODO - fix this for weird contributor names like companies
     contributors = xml_doc.xpath('//overall_official/last_name/node()') or xml_doc.xpath('//lead_sponsor/agency/node()') or ['']
     for person in contributors:
-        name = HumanName(person)
-        contributor = {
-            'prefix': name.title,
-            'given': name.first,
-            'middle': name.middle,
-            'family': name.last,
-            'suffix': name.suffix,
-            'email': '',
-            'ORCID': ''
-        }
+        contributor = parse_contributor(person)
         contributor_list.append(contributor)
     return contributor_list
 
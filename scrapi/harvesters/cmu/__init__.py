@@ -20,4 +20,5 @@ cmu = OAIHarvester(
 )
 
 harvest = cmu.harvest
+iter_harvest = cmu.iter_harvest
 normalize = cmu.normalize
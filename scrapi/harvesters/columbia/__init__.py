@@ -21,4 +21,5 @@ columbia = OAIHarvester(
 )
 
 harvest = columbia.harvest
+iter_harvest = columbia.iter_harvest
 normalize = columbia.normalize
@@ -10,14 +10,14 @@ from __future__ import unicode_literals
 
 import json
 
-import requests
 from datetime import date, timedelta
 
-from nameparser import HumanName
 from dateutil.parser import parse
 
+from scrapi import requests
 from scrapi.linter import lint
 from scrapi.linter.document import RawDocument, NormalizedDocument
+from scrapi.util import parse_contributor
 
 NAME = 'crossref'
 
@@ -68,16 +68,7 @@ def get_contributors(doc):
         full_names.append(full_name)
         orcid = entry.get('ORCID') or ''
     for person in full_names:
-        name = HumanName(person)
-        contributor = {
-            'prefix': name.title,
-            'given': name.first,
-            'middle': name.middle,
-            'family': name.last,
-            'suffix': name.suffix,
-            'email': '',
-            'ORCID': orcid
-        }
+        contributor = parse_contributor(person, orcid=orcid)
         contributor_list.append(contributor)
 
     return contributor_list
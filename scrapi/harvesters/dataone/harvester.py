@@ -10,16 +10,15 @@ from __future__ import unicode_literals
 import re
 
 import logging
-import requests
 
 from lxml import etree
 from dateutil.parser import *
 from xml.etree import ElementTree
 
-from nameparser import HumanName
-
+from scrapi import requests
 from scrapi.linter import lint
 from scrapi.linter.document import RawDocument, NormalizedDocument
+from scrapi.util import parse_contributor
 
 logger = logging.getLogger(__name__)
 
@@ -162,28 +161,10 @@ def get_contributors(doc):
             #       sometimes this yields really weird names like mjg4
             #     # TODO - names not always perfectly lined up with emails...
             #     contributor = name_from_email(email)
-            name = HumanName(contributor)
-            contributor_dict = {
-                'prefix': name.title,
-                'given': name.first,
-                'middle': name.middle,
-                'family': name.last,
-                'suffix': name.suffix,
-                'email': copy_to_unicode(email),
-                'ORCID': ''
-            }
+            contributor_dict = parse_contributor(contributor, email=copy_to_unicode(email))
             contributor_list.append(contributor_dict)
         else:
-            name = HumanName(contributor)
-            contributor_list.append({
-                'prefix': name.title,
-                'given': name.first,
-                'middle': name.middle,
-                'family': name.last,
-                'suffix': name.suffix,
-                'email': '',
-                'ORCID': ''
-            })
+            contributor_list.append(parse_contributor(contributor))
 
     return contributor_list
 
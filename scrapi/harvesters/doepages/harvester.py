@@ -8,16 +8,15 @@ Example query: http://www.osti.gov/pages/pagesxml?nrows=10&EntryDateFrom=01/18/2
 ## Harvester for DOE Pages for SHARE
 from __future__ import unicode_literals
 
-import requests
 from lxml import etree
 from datetime import date, timedelta
 
-from nameparser import HumanName
-
 from dateutil.parser import *
 
+from scrapi import requests
 from scrapi.linter import lint
 from scrapi.linter.document import RawDocument, NormalizedDocument
+from scrapi.util import parse_contributor
 
 NAME = 'doepages'
 
@@ -97,16 +96,7 @@ def get_contributors(doc):
     contributor_list = []
     full_contributors = doc.xpath('//dc:creator/node()', namespaces=NAMESPACES)[0].split(';')
     for person in full_contributors:
-        name = HumanName(person)
-        contributor = {
-            'prefix': name.title,
-            'given': name.first,
-            'middle': name.middle,
-            'family': name.last,
-            'suffix': name.suffix,
-            'email': '',
-            'ORCID': ''
-        }
+        contributor = parse_contributor(person)
         contributor_list.append(contributor)
 
     return contributor_list
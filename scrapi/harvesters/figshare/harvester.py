@@ -14,12 +14,10 @@ import logging
 from dateutil.parser import parse
 from datetime import date, timedelta
 
-import requests
-
-from nameparser import HumanName
-
+from scrapi import requests
 from scrapi.linter import lint
 from scrapi.linter.document import RawDocument, NormalizedDocument
+from scrapi.util import parse_contributor
 
 logger = logging.getLogger(__name__)
 
@@ -85,16 +83,7 @@ def get_contributors(record):
 
     contributor_list = []
     for person in authors:
-        name = HumanName(person['author_name'])
-        contributor = {
-            'prefix': name.title,
-            'given': name.first,
-            'middle': name.middle,
-            'family': name.last,
-            'suffix': name.suffix,
-            'email': '',
-            'ORCID': '',
-        }
+        contributor = parse_contributor(person['author_name'])
         contributor_list.append(contributor)
 
     return contributor_list
@@ -886,4 +886,5 @@ mit = OAIHarvester(
 )
 
 harvest = mit.harvest
+iter_harvest = mit.iter_harvest
 normalize = mit.normalize
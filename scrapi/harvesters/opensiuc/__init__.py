@@ -136,4 +136,5 @@ opensiuc = OAIHarvester(
 )
 
 harvest = opensiuc.harvest
+iter_harvest = opensiuc.iter_harvest
 normalize = opensiuc.normalize
@@ -21,13 +21,12 @@ from __future__ import unicode_literals
 import time
 from datetime import date, timedelta
 
-import requests
 from lxml import etree
 from dateutil.parser import *
-from nameparser import HumanName
-
+from scrapi import requests
 from scrapi.linter import lint
 from scrapi.linter.document import RawDocument, NormalizedDocument
+from scrapi.util import parse_contributor
 
 try:
     from settings import PLOS_API_KEY
@@ -120,16 +119,7 @@ def get_contributors(record):
     contributor_list = []
     contributors = record.xpath('//arr[@name="author_display"]/str/node()') or ['']
     for person in contributors:
-        name = HumanName(person)
-        contributor = {
-            'prefix': name.title,
-            'given': name.first,
-            'middle': name.middle,
-            'family': name.last,
-            'suffix': name.suffix,
-            'email': '',
-            'ORCID': ''
-        }
+        contributor = parse_contributor(person)
         contributor_list.append(contributor)
     return contributor_list
 
@@ -16,4 +16,5 @@ pubmed = OAIHarvester(
 )
 
 harvest = pubmed.harvest
+iter_harvest = pubmed.iter_harvest
 normalize = pubmed.normalize
@@ -8,17 +8,16 @@ Example API query: http://www.osti.gov/scitech/scitechxml?EntryDateFrom=02%2F02%
 from __future__ import unicode_literals
 
 import re
-import requests
 import datetime
 
 from lxml import etree
 
-from nameparser import HumanName
-
 from dateutil.parser import *
 
+from scrapi import requests
 from scrapi.linter import lint
 from scrapi.linter.document import RawDocument, NormalizedDocument
+from scrapi.util import parse_contributor
 
 NAME = 'scitech'
 terms_url = 'http://purl.org/dc/terms/'
@@ -139,16 +138,7 @@ def get_contributors(record):
                 continue
             if '[' in person:
                 person = person[:person.index('[')].strip()
-            name = HumanName(person)
-            contributor = {
-                'prefix': name.title,
-                'given': name.first,
-                'middle': name.middle,
-                'family': name.last,
-                'suffix': name.suffix,
-                'email': '',
-                'ORCID': ''
-            }
+            contributor = parse_contributor(person)
             contributor_list.append(contributor)
     return contributor_list
 
@@ -18,4 +18,5 @@ spdataverse = OAIHarvester(
 )
 
 harvest = spdataverse.harvest
+iter_harvest = spdataverse.iter_harvest
 normalize = spdataverse.normalize
@@ -39,4 +39,5 @@ stcloud = OAIHarvester(
 )
 
 harvest = stcloud.harvest
+iter_harvest = stcloud.iter_harvest
 normalize = stcloud.normalize
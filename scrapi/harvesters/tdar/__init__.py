@@ -42,4 +42,5 @@ tdar = tdarHarvester(
 )
 
 harvest = tdar.harvest
+iter_harvest = tdar.iter_harvest
 normalize = tdar.normalize
@@ -71,4 +71,5 @@ texasstate = OAIHarvester(
 )
 
 harvest = texasstate.harvest
+iter_harvest = texasstate.iter_harvest
 normalize = texasstate.normalize
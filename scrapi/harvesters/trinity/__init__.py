@@ -60,4 +60,5 @@ trinity = OAIHarvester(
 )
 
 harvest = trinity.harvest
+iter_harvest = trinity.iter_harvest
 normalize = trinity.normalize
@@ -20,4 +20,5 @@ ucescholarship = OAIHarvester(
 )
 
 harvest = ucescholarship.harvest
+iter_harvest = ucescholarship.iter_harvest
 normalize = ucescholarship.normalize
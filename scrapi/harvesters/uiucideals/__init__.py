@@ -20,4 +20,5 @@ uiucideals = OAIHarvester(
 )
 
 harvest = uiucideals.harvest
+iter_harvest = uiucideals.iter_harvest
 normalize = uiucideals.normalize
@@ -20,4 +20,5 @@ upennsylvania = OAIHarvester(
 )
 
 harvest = upennsylvania.harvest
+iter_harvest = upennsylvania.iter_harvest
 normalize = upennsylvania.normalize
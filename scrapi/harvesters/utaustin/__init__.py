@@ -60,4 +60,5 @@ utaustin = OAIHarvester(
 )
 
 harvest = utaustin.harvest
+iter_harvest = utaustin.iter_harvest
 normalize = utaustin.normalize
@@ -19,4 +19,5 @@ uwashington = OAIHarvester(
 )
 
 harvest = uwashington.harvest
+iter_harvest = uwashington.iter_harvest
 normalize = uwashington.normalize
@@ -49,4 +49,5 @@ valposcholar = OAIHarvester(
 )
 
 harvest = valposcholar.harvest
+iter_harvest = valposcholar.iter_harvest
 normalize = valposcholar.normalize
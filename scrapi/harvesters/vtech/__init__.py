@@ -19,4 +19,5 @@ vtech = OAIHarvester(
 )
 
 harvest = vtech.harvest
+iter_harvest = vtech.iter_harvest
 normalize = vtech.normalize
@@ -110,4 +110,5 @@ waynestate = OAIHarvester(
 )
 
 harvest = waynestate.harvest
+iter_harvest = waynestate.iter_harvest
 normalize = waynestate.normalize
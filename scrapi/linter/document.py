@@ -1,5 +1,53 @@
-from scrapi.linter.util import lint
 from scrapi.linter.util import truthy
+from scrapi.linter.util import compile_schema
+
+
+# Values of these fields are shared by every document from a source
+INTERNED_FIELDS = ('source', 'filetype')
+
+# Fields holding dicts, or lists of dicts, whose keys are part of the schema
+NESTED_FIELDS = ('contributors', 'id', 'timestamps')
+
+# Shared copies of every key in the schema, see BaseDocument. Filled in
+# once the document classes are defined and never grown after that, as
+# keys outside the schema, like those of properties, are arbitrary
+_schema_keys = {}
+
+# Shared values of INTERNED_FIELDS, there is one of each per source
+# but push API sources are not known ahead of time, so stop somewhere
+MAX_INTERNED = 1024
+_interned = {}
+
+
+def intern_string(string):
+    """ Like intern, but for unicode too. Keyed by type so that
+    interning never turns a unicode string into a str """
+    key = (type(string), string)
+    if key not in _interned and len(_interned) >= MAX_INTERNED:
+        return string
+    return _interned.setdefault(key, string)
+
+
+def share_keys(mapping):
+    """ Replaces, in place, the keys of mapping that are in the schema with shared copies """
+    for key in mapping.keys():
+        shared = _schema_keys.get((type(key), key))
+        if shared is not None and shared is not key:
+            mapping[shared] = mapping.pop(key)
+
+
+def intern_keys(attributes):
+    """ Shares the schema keys of attributes and of its NESTED_FIELDS """
+    share_keys(attributes)
+    for field in NESTED_FIELDS:
+        value = attributes.get(field)
+        for item in (value if isinstance(value, list) else [value]):
+            if isinstance(item, dict):
+                share_keys(item)
+
+
+def _rehydrate(cls, attributes):
+    return cls(attributes, trusted=True)
 
 
 class BaseDocument(object):
@@ -7,15 +55,40 @@ class BaseDocument(object):
     """
         For file objects. Automatically lints input to ensure
         compatibility with scrAPI.
+
+        Pass trusted=True only for attributes that came from a document
+        that has already been linted, to skip linting them again.
+        Unpickled documents are trusted.
     """
 
+    __slots__ = ('attributes',)
+
     REQUIRED_FIELDS = {}
 
-    def __init__(self, attributes):
-        lint(attributes, self.REQUIRED_FIELDS)
+    def __init__(self, attributes, trusted=False):
+        if not trusted:
+            self.validate(attributes)
+
+        # Documents are held by the thousands, share their keys and sources
+        intern_keys(attributes)
+        for field in INTERNED_FIELDS:
+            if isinstance(attributes.get(field), basestring):
+                attributes[field] = intern_string(attributes[field])
 
         self.attributes = attributes
 
+    def __reduce__(self):
+        return _rehydrate, (self.__class__, self.attributes)
+
+    @classmethod
+    def validate(cls, attributes):
+        # REQUIRED_FIELDS is compiled the first time each class is used
+        validator = cls.__dict__.get('_validator')
+        if validator is None:
+            validator = cls._validator = compile_schema(cls.REQUIRED_FIELDS)
+
+        validator(attributes)
+
     def get(self, attribute):
         """
             Maintains compatibility with previous dictionary implementation of scrAPI
@@ -42,8 +115,36 @@ class RawDocument(BaseDocument):
         'filetype': unicode
     }
 
+    # Harvesters may keep whatever they parsed doc into parsed, so that
+    # normalizing in the same process can skip parsing it again.
+    # It is never pickled, so it is lost whenever the document is sent elsewhere
+    __slots__ = ('parsed',)
+
+    def __init__(self, attributes, trusted=False):
+        super(RawDocument, self).__init__(attributes, trusted=trusted)
+        self.parsed = None
+
+
+class RawDocumentClaim(BaseDocument):
+
+    """
+        A RawDocument whose doc has already been written to storage.
+        Carries everything but the doc itself, which can be fetched
+        back with store.redeem.
+    """
+
+    __slots__ = ()
+
+    REQUIRED_FIELDS = {
+        'docID': unicode,
+        'source': unicode,
+        'filetype': unicode
+    }
+
 
 class NormalizedDocument(BaseDocument):
+    __slots__ = ()
+
     CONTRIBUTOR_FIELD = {
         'email': unicode,
         'prefix': unicode,
@@ -67,3 +168,35 @@ class NormalizedDocument(BaseDocument):
         'tags': [unicode],
         'dateUpdated': unicode
     }
+
+
+def schema_keys(schema):
+    if isinstance(schema, dict):
+        for key, value in schema.items():
+            yield key
+            for nested in schema_keys(value):
+                yield nested
+    elif isinstance(schema, (list, tuple)):
+        for item in schema:
+            for nested in schema_keys(item):
+                yield nested
+
+
+# Keys documents carry beyond what they are required to
+OPTIONAL_KEYS = (
+    'doc', 'properties', 'timestamps', 'raw', 'dateCollected', 'ORCID',
+    'harvestTaskCreated', 'harvestStarted', 'harvestFinished',
+    'normalizeTaskCreated', 'normalizeStarted', 'normalizeFinished',
+)
+
+
+def share_schema_keys(classes):
+    keys = set(OPTIONAL_KEYS)
+    for cls in classes:
+        keys.update(schema_keys(cls.REQUIRED_FIELDS))
+
+    for key in keys:
+        for shared in (str(key), unicode(key)):
+            _schema_keys[(type(shared), shared)] = shared
+
+share_schema_keys([RawDocument, RawDocumentClaim, NormalizedDocument])
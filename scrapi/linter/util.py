@@ -23,6 +23,82 @@ def lint(actual, expected, name=''):
         pretty_isinstance(actual, expected, name)
 
 
+class Invalid(Exception):
+    """ Raised by compiled validators. Collects the path to the invalid
+    field while propagating, so that it is only built on failure.
+    fail(name) raises the same error lint would have for that name. """
+
+    def __init__(self, fail):
+        self.fail = fail
+        self.path = []
+
+
+def compile_schema(expected):
+    """ Compiles expected, as given to lint, into a function of actual that
+    raises exactly what lint(actual, expected) would """
+    validate = _compile(expected)
+
+    def validator(actual):
+        try:
+            validate(actual)
+        except Invalid as e:
+            e.fail(''.join(' {}'.format(field_name) for field_name in reversed(e.path)))
+
+    return validator
+
+
+def _compile(expected):
+    if isinstance(expected, tuple) and isinstance(expected[0], FunctionType):
+        return _compile_function(expected[0], expected[1:])
+    elif isinstance(expected, dict):
+        return _compile_dict(expected)
+    elif isinstance(expected, list):
+        return _compile_list(expected[0])
+    return _compile_type(expected)
+
+
+def _compile_function(func, args):
+    def validate(actual):
+        try:
+            func(actual, *args, name='')
+        except TypeError:
+            raise Invalid(lambda name: func(actual, *args, name=name))
+    return validate
+
+
+def _compile_type(expected):
+    def validate(actual):
+        if not isinstance(actual, expected):
+            raise Invalid(lambda name: pretty_isinstance(actual, expected, name))
+    return validate
+
+
+def _compile_dict(expected):
+    is_dict = _compile_type(dict)
+    fields = [(field_name, _compile(value)) for field_name, value in expected.items()]
+
+    def validate(actual):
+        is_dict(actual)
+        for field_name, validate_field in fields:
+            try:
+                validate_field(actual[field_name])
+            except Invalid as e:
+                e.path.append(field_name)
+                raise
+    return validate
+
+
+def _compile_list(expected):
+    is_list = _compile_type(list)
+    validate_item = _compile(expected)
+
+    def validate(actual):
+        is_list(actual)
+        for item in actual:
+            validate_item(item)
+    return validate
+
+
 def pretty_isinstance(actual, expected, name):
     if not isinstance(actual, expected):
         actual = type(actual)
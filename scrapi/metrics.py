@@ -0,0 +1,355 @@
+"""Latency histograms and throughput counters for each harvester and stage.
+
+Stages are the time a harvest spent waiting for a worker (harvestQueue),
+harvesting, the time a document spent waiting to be normalized
+(normalizeQueue), normalizing, and each processor ("normalized.<name>",
+"raw.<name>" and "flush.<name>"). They are worked out from the timestamps
+documents already carry and by timing the processors.
+
+Every process records into its own registry. When METRICS_DIRECTORY is set
+each process also saves a snapshot there every METRICS_SAVE_INTERVAL
+seconds so that load() can combine the metrics of every worker.
+"""
+
+from __future__ import absolute_import
+
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from dateutil import parser
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from scrapi import settings
+from scrapi.util import make_dir
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of each histogram bucket, anything longer goes in a final bucket
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600, 4 * 3600, 24 * 3600)
+
+# Documents processed outside of any one harvester, e.g. a bulk flush
+ALL = 'all'
+
+
+class Histogram(object):
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, seconds):
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, other):
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    # :: Float -> Maybe Float
+    def percentile(self, percent):
+        ''' The upper bound of the bucket percent of observations fall in '''
+        if not self.count:
+            return None
+
+        seen = 0
+        for bound, count in zip(BUCKETS + (self.max,), self.buckets):
+            seen += count
+            if seen >= self.count * percent / 100.0:
+                return min(bound, self.max)
+
+    def to_dict(self):
+        return {
+            'buckets': self.buckets,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.count and self.total / self.count,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.buckets = list(data['buckets'])
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        return histogram
+
+
+class Throughput(object):
+    ''' Counts documents, and the span of time they were counted over '''
+
+    def __init__(self):
+        self.count = 0
+        self.first = None
+        self.last = None
+
+    def add(self, count, now):
+        self.count += count
+        self.first = now if self.first is None else min(self.first, now)
+        self.last = now if self.last is None else max(self.last, now)
+
+    def merge(self, other):
+        if other.first is not None:
+            self.add(other.count, other.first)
+            self.add(0, other.last)
+
+    @property
+    def rate(self):
+        ''' Documents per second, None until there is a span to measure '''
+        if self.first is None or self.last == self.first:
+            return None
+        return self.count / (self.last - self.first)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'first': self.first,
+            'last': self.last,
+            'rate': self.rate,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        throughput = cls()
+        throughput.count = data['count']
+        throughput.first = data['first']
+        throughput.last = data['last']
+        return throughput
+
+
+class Registry(object):
+    ''' Histograms and throughputs keyed by (harvester, stage) '''
+
+    def __init__(self):
+        self.histograms = {}
+        self.throughputs = {}
+        self.lock = threading.Lock()
+        self.last_save = time.time()
+
+    def observe(self, source, stage, seconds):
+        with self.lock:
+            key = (source, stage)
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(seconds)
+
+    def count(self, source, stage, count=1, now=None):
+        with self.lock:
+            key = (source, stage)
+            if key not in self.throughputs:
+                self.throughputs[key] = Throughput()
+            self.throughputs[key].add(count, time.time() if now is None else now)
+
+    def merge(self, other):
+        with self.lock:
+            for key, histogram in other.histograms.items():
+                self.histograms.setdefault(key, Histogram()).merge(histogram)
+            for key, throughput in other.throughputs.items():
+                self.throughputs.setdefault(key, Throughput()).merge(throughput)
+
+    def clear(self):
+        with self.lock:
+            self.histograms.clear()
+            self.throughputs.clear()
+
+    # :: Dict
+    def snapshot(self):
+        ''' {harvester: {stage: {'latency': {...}, 'throughput': {...}}}} '''
+        with self.lock:
+            data = {}
+            for (source, stage), histogram in self.histograms.items():
+                data.setdefault(source, {}).setdefault(stage, {})['latency'] = histogram.to_dict()
+            for (source, stage), throughput in self.throughputs.items():
+                data.setdefault(source, {}).setdefault(stage, {})['throughput'] = throughput.to_dict()
+            return data
+
+    @classmethod
+    def from_snapshot(cls, data):
+        registry = cls()
+        for source, stages in data.items():
+            for stage, metrics in stages.items():
+                if 'latency' in metrics:
+                    registry.histograms[(source, stage)] = Histogram.from_dict(metrics['latency'])
+                if 'throughput' in metrics:
+                    registry.throughputs[(source, stage)] = Throughput.from_dict(metrics['throughput'])
+        return registry
+
+    def save(self, path):
+        make_dir(os.path.dirname(os.path.abspath(path)))
+
+        # Write then rename so that readers never see half a snapshot
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.rename(path + '.tmp', path)
+
+        self.last_save = time.time()
+
+
+registry = Registry()
+
+
+def reset(*args, **kwargs):
+    ''' Forked workers start from nothing rather than their parent's metrics '''
+    registry.clear()
+    registry.last_save = time.time()
+
+worker_process_init.connect(reset)
+
+
+def snapshot_path():
+    return os.path.join(settings.METRICS_DIRECTORY, '{}-{}.json'.format(socket.gethostname(), os.getpid()))
+
+
+def maybe_save():
+    if settings.METRICS_DIRECTORY and time.time() - registry.last_save >= settings.METRICS_SAVE_INTERVAL:
+        save()
+
+
+def save(*args, **kwargs):
+    if not (settings.COLLECT_METRICS and settings.METRICS_DIRECTORY):
+        return
+
+    try:
+        registry.save(snapshot_path())
+    except (IOError, OSError):
+        logger.exception('Could not save metrics')
+
+    prune()
+
+worker_process_shutdown.connect(save)
+
+
+def prune():
+    ''' Deletes the snapshots of processes that exited long ago,
+    which would otherwise build up with every worker restart
+    '''
+    cutoff = time.time() - settings.METRICS_MAX_AGE
+
+    for filename in os.listdir(settings.METRICS_DIRECTORY):
+        path = os.path.join(settings.METRICS_DIRECTORY, filename)
+        if not filename.endswith(('.json', '.json.tmp')):
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass  # Pruned by another process
+
+
+# :: Registry
+def load():
+    ''' This process's metrics combined with every snapshot in METRICS_DIRECTORY '''
+    combined = Registry()
+    combined.merge(registry)
+
+    if not settings.METRICS_DIRECTORY or not os.path.isdir(settings.METRICS_DIRECTORY):
+        return combined
+
+    own = snapshot_path()
+    for filename in os.listdir(settings.METRICS_DIRECTORY):
+        path = os.path.join(settings.METRICS_DIRECTORY, filename)
+        if not filename.endswith('.json') or path == own:
+            continue
+        try:
+            with open(path) as f:
+                combined.merge(Registry.from_snapshot(json.load(f)))
+        except (IOError, ValueError):
+            logger.warning('Could not read metrics from {}'.format(path))
+
+    return combined
+
+
+def observe(source, stage, seconds):
+    if settings.COLLECT_METRICS:
+        registry.observe(source, stage, seconds)
+        maybe_save()
+
+
+def count(source, stage, count=1):
+    if settings.COLLECT_METRICS:
+        registry.count(source, stage, count)
+        maybe_save()
+
+
+@contextmanager
+def timed(source, stage, count=1):
+    ''' Observes how long the block took and counts count documents through
+    stage, pass count=None when there is nothing to count
+    '''
+    if not settings.COLLECT_METRICS:
+        yield
+        return
+
+    start = time.time()
+    try:
+        yield
+    finally:
+        registry.observe(source, stage, time.time() - start)
+        if count is not None:
+            registry.count(source, stage, count)
+        maybe_save()
+
+
+# :: Dict -> Str -> Str -> Maybe Float
+def elapsed(timestamps, start, end):
+    try:
+        return (parser.parse(timestamps[end]) - parser.parse(timestamps[start])).total_seconds()
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+
+
+def record_harvest(source, timestamps, documents):
+    ''' Records a harvest, or a chunk of one, that yielded this many documents.
+    Chunks should be timed from the end of the chunk before them
+    '''
+    if not settings.COLLECT_METRICS:
+        return
+
+    for stage, start, end in (
+        ('harvestQueue', 'harvestTaskCreated', 'harvestStarted'),
+        ('harvest', 'harvestStarted', 'harvestFinished'),
+    ):
+        seconds = elapsed(timestamps, start, end)
+        if seconds is not None:
+            observe(source, stage, seconds)
+
+    count(source, 'harvest', documents)
+
+
+def record_normalize(source, timestamps):
+    if not settings.COLLECT_METRICS:
+        return
+
+    for stage, start, end in (
+        ('normalizeQueue', 'normalizeTaskCreated', 'normalizeStarted'),
+        ('normalize', 'normalizeStarted', 'normalizeFinished'),
+    ):
+        seconds = elapsed(timestamps, start, end)
+        if seconds is not None:
+            observe(source, stage, seconds)
+
+    count(source, 'normalize')
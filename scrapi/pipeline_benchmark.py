@@ -0,0 +1,354 @@
+"""End to end benchmarks of scrapi.tasks, from run_harvester to the processors.
+
+A corpus of documents, synthetic or replayed from a recorded harvest and
+repeated up to the size asked for, stands in for the harvester. The tasks
+run on a real Celery worker with prefork worker processes. Messages go
+through kombu's filesystem transport in a directory on /dev/shm (when
+there is one), which keeps the broker in memory without RabbitMQ while
+still sharing it between processes. The 'standin' processor takes the
+place of Cassandra and Elasticsearch, and the archive is kept in the same
+directory.
+
+The results are end to end documents/sec, how many messages of which size
+each task sent through the broker, how long each task took to run, and
+the per-stage metrics of scrapi.metrics.
+"""
+
+from __future__ import absolute_import
+
+import os
+import json
+import time
+import shutil
+import signal
+import cPickle
+import logging
+import tempfile
+import multiprocessing
+from contextlib import contextmanager
+from base64 import b64decode
+from collections import defaultdict
+
+from celery import signals
+
+from scrapi import util
+from scrapi import tasks
+from scrapi import metrics
+from scrapi import settings
+from scrapi import benchmark
+from scrapi.processing.base import BaseProcessor
+from scrapi.linter.document import RawDocument, NormalizedDocument
+
+
+logger = logging.getLogger(__name__)
+
+SHARED_MEMORY = '/dev/shm'
+
+
+class Corpus(object):
+    ''' Stands in for a harvester, harvesting raw_docs from memory and
+    normalizing them with normalize
+    '''
+
+    def __init__(self, name, raw_docs, normalize):
+        self.name = name
+        self.raw_docs = raw_docs
+        self.normalize = normalize
+
+    def harvest(self, days_back=1):
+        return list(self.raw_docs)
+
+    def iter_harvest(self, days_back=1):
+        return iter(self.raw_docs)
+
+    # :: Int
+    def expected(self):
+        ''' How many documents normalize, and so reach process_normalized '''
+        return len(filter(None, (self.normalize(raw) for raw in self.raw_docs)))
+
+
+def normalize_synthetic(raw_doc):
+    return NormalizedDocument({
+        'title': u'Synthetic document {}'.format(raw_doc['docID']),
+        'contributors': [{'given': u'Test', 'family': u'Contributor', 'email': u'', 'prefix': u'', 'middle': u'', 'suffix': u''}],
+        'id': {
+            'url': u'http://example.com/{}'.format(raw_doc['docID']),
+            'serviceID': raw_doc['docID'],
+            'doi': u''
+        },
+        'source': raw_doc['source'],
+        'description': raw_doc['doc'].decode('utf-8'),
+        'tags': [u'benchmark'],
+        'dateUpdated': u'2015-01-01T00:00:00+00:00'
+    })
+
+
+# :: Int -> Int -> Corpus
+def synthetic_corpus(size, doc_size=2048):
+    return Corpus('synthetic', [
+        RawDocument({
+            'doc': str(i).ljust(doc_size, 'x'),
+            'docID': unicode(i),
+            'source': u'synthetic',
+            'filetype': u'xml'
+        })
+        for i in xrange(size)
+    ], normalize_synthetic)
+
+
+# :: Str -> Int -> Corpus
+def recorded_corpus(harvester_name, size, days_back=1):
+    ''' The documents of harvester_name's latest recorded harvest,
+    repeated with distinct docIDs until there are size of them
+    '''
+    cassette = benchmark.latest_cassette(harvester_name)
+    if not cassette:
+        raise ValueError('No recorded harvest for {} in {}'.format(harvester_name, settings.RECORD_DIRECTORY))
+
+    harvester = util.import_harvester(harvester_name)
+    with benchmark.worker_harvest(), benchmark.replay.use_cassette(cassette):
+        recorded = list(harvester.harvest(days_back=days_back))
+
+    if not recorded:
+        raise ValueError('The recorded harvest for {} is empty'.format(harvester_name))
+
+    raw_docs = []
+    for i in xrange(size):
+        raw = recorded[i % len(recorded)]
+        if i >= len(recorded):
+            raw = RawDocument(dict(raw.attributes, docID=u'{}-{}'.format(raw['docID'], i // len(recorded))), trusted=True)
+        raw_docs.append(raw)
+
+    return Corpus(harvester_name, raw_docs, harvester.normalize)
+
+
+# :: Str -> Dict
+def broker_messages(folder):
+    ''' The number and total size of the messages each task sent
+    through the filesystem transport, read back from folder
+    '''
+    messages = defaultdict(lambda: {'count': 0, 'bytes': 0})
+
+    for filename in os.listdir(folder):
+        with open(os.path.join(folder, filename), 'rb') as f:
+            envelope = f.read()
+
+        try:
+            name = cPickle.loads(b64decode(json.loads(envelope)['body']))['task']
+        except Exception:
+            name = 'unknown'
+
+        messages[name]['count'] += 1
+        messages[name]['bytes'] += len(envelope)
+
+    return dict(messages)
+
+
+class StandInProcessor(BaseProcessor):
+    ''' Pretends to write documents, taking STANDIN_LATENCY seconds per
+    document and STANDIN_FLUSH_LATENCY seconds per flush, so that the rest
+    of the pipeline can be benchmarked without Cassandra or Elasticsearch.
+
+    It is defined here rather than in scrapi.processing so that it is only
+    available to the processes running a benchmark.
+    '''
+    NAME = 'standin'
+
+    # Shared counters of documents processed, set up by run before forking
+    # its workers so that every worker process counts into them
+    counters = None
+
+    def count(self, name):
+        if self.counters:
+            with self.counters[name].get_lock():
+                self.counters[name].value += 1
+
+    def process_raw(self, raw_doc, **kwargs):
+        if settings.STANDIN_LATENCY:
+            time.sleep(settings.STANDIN_LATENCY)
+        self.count('raw')
+
+    def process_normalized(self, raw_doc, normalized, **kwargs):
+        if settings.STANDIN_LATENCY:
+            time.sleep(settings.STANDIN_LATENCY)
+        self.count('normalized')
+
+    def flush(self):
+        if settings.STANDIN_FLUSH_LATENCY:
+            time.sleep(settings.STANDIN_FLUSH_LATENCY)
+
+
+_task_started = {}
+
+
+def task_started(task_id=None, **kwargs):
+    _task_started[task_id] = time.time()
+
+
+def task_finished(task_id=None, task=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        metrics.observe(metrics.ALL, 'task.{}'.format(task.name), time.time() - started)
+
+
+def start_worker(concurrency):
+    tasks.app.Worker(
+        concurrency=concurrency,
+        pool_cls='prefork',
+        loglevel='WARNING',
+        quiet=True,
+        without_gossip=True,
+        without_mingle=True,
+        without_heartbeat=True,
+    ).start()
+
+
+def configure(directory):
+    ''' The Celery configuration and settings to run the benchmark with '''
+    queue = os.path.join(directory, 'queue')
+    processed = os.path.join(directory, 'processed')
+    for folder in (queue, processed):
+        util.make_dir(folder)
+
+    celery_config = {
+        'BROKER_URL': 'filesystem://',
+        'BROKER_TRANSPORT_OPTIONS': {
+            'data_folder_in': queue,
+            'data_folder_out': queue,
+            'store_processed': True,
+            'processed_folder': processed,
+        },
+        'CELERY_ALWAYS_EAGER': False,
+        'CELERYD_HIJACK_ROOT_LOGGER': False,
+        # The migration tasks need Cassandra
+        'CELERY_IMPORTS': ('scrapi.tasks',),
+    }
+    scrapi_settings = {
+        'CELERY_ALWAYS_EAGER': False,
+        'USE_FLUENTD': False,
+        'COLLECT_METRICS': True,
+        'METRICS_DIRECTORY': os.path.join(directory, 'metrics'),
+        'METRICS_SAVE_INTERVAL': 1,
+        'ARCHIVE_DIRECTORY': os.path.join(directory, 'archive', ''),
+        'ARCHIVE_CATALOG': settings.ARCHIVE_CATALOG and os.path.join(directory, 'catalog.sqlite'),
+    }
+
+    return processed, celery_config, scrapi_settings
+
+
+@contextmanager
+def overridden(obj, values):
+    ''' Sets values on obj, putting back what was there afterwards '''
+    missing = object()
+    originals = {key: getattr(obj, key, missing) for key in values}
+
+    for key, value in values.items():
+        setattr(obj, key, value)
+    try:
+        yield
+    finally:
+        for key, value in originals.items():
+            if value is missing:
+                delattr(obj, key)
+            else:
+                setattr(obj, key, value)
+
+
+# :: Corpus -> Int -> Int -> Dict
+def run(corpus, workers=2, timeout=600):
+    ''' Harvests, normalizes and processes every document in corpus
+    across workers worker processes, with the processors currently
+    in RAW_PROCESSING and NORMALIZED_PROCESSING
+    '''
+    expected = corpus.expected()
+    directory = tempfile.mkdtemp(prefix='scrapi-pipeline-', dir=SHARED_MEMORY if os.path.isdir(SHARED_MEMORY) else None)
+
+    processed, celery_config, scrapi_settings = configure(directory)
+
+    # Workers are forked from here, and inherit the corpus and the counters
+    with overridden(tasks.app.conf, celery_config), overridden(settings, scrapi_settings), overridden(tasks, {
+        'import_harvester': lambda name: corpus
+    }), overridden(StandInProcessor, {
+        'counters': {
+            'raw': multiprocessing.Value('l', 0),
+            'normalized': multiprocessing.Value('l', 0),
+        }
+    }):
+        try:
+            metrics.reset()
+            return run_worker(corpus, expected, processed, workers, timeout)
+        finally:
+            metrics.reset()
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+# :: Corpus -> Int -> Str -> Int -> Int -> Dict
+def run_worker(corpus, expected, processed, workers, timeout):
+    worker = None
+    try:
+        signals.task_prerun.connect(task_started)
+        signals.task_postrun.connect(task_finished)
+
+        worker = multiprocessing.Process(target=start_worker, args=(workers,))
+        worker.start()
+
+        start = time.time()
+        tasks.run_harvester.delay(corpus.name)
+
+        done = lambda: (StandInProcessor.counters['raw'].value >= len(corpus.raw_docs) and
+                        StandInProcessor.counters['normalized'].value >= expected)
+        while not done():
+            if time.time() - start > timeout or not worker.is_alive():
+                raise RuntimeError('Processed {} raw and {} normalized of {} documents before giving up'.format(
+                    StandInProcessor.counters['raw'].value, StandInProcessor.counters['normalized'].value, len(corpus.raw_docs)
+                ))
+            time.sleep(0.05)
+
+        elapsed = time.time() - start
+
+        # A warm shutdown, so that every worker process saves its metrics
+        os.kill(worker.pid, signal.SIGTERM)
+        worker.join(timeout=60)
+
+        messages = broker_messages(processed)
+        stages = metrics.load().snapshot()
+        task_metrics = {
+            stage[len('task.'):]: values['latency']
+            for stage, values in stages.get(metrics.ALL, {}).items()
+            if stage.startswith('task.')
+        }
+        busy = sum(latency['total'] for latency in task_metrics.values())
+        runs = sum(latency['count'] for latency in task_metrics.values())
+
+        return {
+            'commit': benchmark.commit(),
+            'created': util.timestamp(),
+            'corpus': corpus.name,
+            'documents': len(corpus.raw_docs),
+            'normalized': expected,
+            'workers': workers,
+            'settings': {
+                key: getattr(settings, key) for key in (
+                    'RAW_PROCESSING', 'NORMALIZED_PROCESSING', 'STANDIN_LATENCY', 'STANDIN_FLUSH_LATENCY',
+                    'STREAM_HARVESTS', 'HARVEST_CHUNK_SIZE', 'NORMALIZE_BATCH_SIZE', 'CLAIM_CHECK_RAW',
+                    'CELERY_TASK_SERIALIZER'
+                )
+            },
+            'elapsedSeconds': elapsed,
+            'documentsPerSecond': len(corpus.raw_docs) / elapsed,
+            'messages': messages,
+            'totalMessages': sum(message['count'] for message in messages.values()),
+            'totalBytes': sum(message['bytes'] for message in messages.values()),
+            'tasks': task_metrics,
+            # Worker time per task spent outside of task bodies: messaging,
+            # serialization, handing tasks to worker processes and idling
+            'overheadPerTask': runs and (elapsed * workers - busy) / runs,
+            'stages': {
+                name: stages.get(name, {}) for name in (corpus.name, metrics.ALL)
+            },
+        }
+    finally:
+        if worker and worker.is_alive():
+            worker.terminate()
+        signals.task_prerun.disconnect(task_started)
+        signals.task_postrun.disconnect(task_finished)
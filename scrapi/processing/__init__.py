@@ -1,5 +1,9 @@
 import os
+import logging
 
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from scrapi import metrics
 from scrapi import settings
 from scrapi.processing.base import BaseProcessor
 
@@ -11,14 +15,51 @@ for mod in os.listdir(os.path.dirname(__file__)):
 
 from . import *
 
+logger = logging.getLogger(__name__)
+
+
+# Processor instances for this process, keyed by name
+_processors = {}
+
 
 def get_processor(processor_name):
+    ''' Processors are built the first time they are asked for
+    and reused for every document after that
+    '''
+    try:
+        return _processors[processor_name]
+    except KeyError:
+        pass
+
     for klass in BaseProcessor.__subclasses__():
         if klass.NAME == processor_name:
-            return klass()
+            _processors[processor_name] = klass()
+            return _processors[processor_name]
     raise NotImplementedError('No Processor {}'.format(processor_name))
 
 
+def reset_processors(*args, **kwargs):
+    ''' Each forked worker builds its own processors
+    rather than reusing the ones inherited from its parent
+    '''
+    _processors.clear()
+
+worker_process_init.connect(reset_processors)
+
+
+def flush_processors(*args, **kwargs):
+    for name, processor in _processors.items():
+        try:
+            with metrics.timed(metrics.ALL, 'flush.{}'.format(name), count=None):
+                processor.flush()
+        except Exception:
+            logger.exception('Could not flush processor {}'.format(name))
+            if settings.DEBUG:
+                raise
+
+worker_process_shutdown.connect(flush_processors)
+
+
 def process_normalized(raw_doc, normalized, kwargs):
     ''' kwargs is a dictiorary of kwargs.
         keyed by the processor name
@@ -29,8 +70,10 @@ def process_normalized(raw_doc, normalized, kwargs):
         extras = kwargs.get(p, {})
 
         try:
-            get_processor(p).process_normalized(raw_doc, normalized, **extras)
+            with metrics.timed(raw_doc['source'], 'normalized.{}'.format(p)):
+                get_processor(p).process_normalized(raw_doc, normalized, **extras)
         except Exception:
+            logger.exception('Processor {} failed on {}'.format(p, raw_doc['docID']))
             if settings.DEBUG:
                 raise
 
@@ -39,7 +82,9 @@ def process_raw(raw_doc, kwargs):
     for p in settings.RAW_PROCESSING:
         extras = kwargs.get(p, {})
         try:
-            get_processor(p).process_raw(raw_doc, **extras)
+            with metrics.timed(raw_doc['source'], 'raw.{}'.format(p)):
+                get_processor(p).process_raw(raw_doc, **extras)
         except Exception:
+            logger.exception('Processor {} failed on {}'.format(p, raw_doc['docID']))
             if settings.DEBUG:
                 raise
@@ -6,3 +6,8 @@ class BaseProcessor(object):
 
     def process_normalized(self, raw_doc, normalized, **kwargs):
         pass
+
+    def flush(self):
+        """ Called when a batch of documents is done and when the worker
+        shuts down, for processors that buffer their writes """
+        pass
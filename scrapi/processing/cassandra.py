@@ -2,13 +2,16 @@ from __future__ import absolute_import
 
 import json
 import logging
+import threading
 from uuid import uuid4
 
+from cqlengine import connection
 from cqlengine import columns, Model
 from cqlengine.management import sync_table
 
 from scrapi import events
 from scrapi import settings
+from scrapi.util import content_digest
 from scrapi import database  # noqa
 from scrapi.processing.base import BaseProcessor
 
@@ -26,9 +29,19 @@ class CassandraProcessor(BaseProcessor):
         sync_table(DocumentModel)
         sync_table(VersionModel)
 
+        if settings.CASSANDRA_ASYNC_WRITES:
+            self.writer = AsyncWriter(connection.get_session(), settings.CASSANDRA_MAX_IN_FLIGHT)
+        else:
+            self.writer = None
+
+        # The event index of each write left for flush, keyed by (docID, source)
+        self.deferred = {}
+
     @events.logged(events.PROCESSING, 'normalized.cassandra')
-    def process_normalized(self, raw_doc, normalized):
-        self.send_to_database(
+    def process_normalized(self, raw_doc, normalized, wait=True):
+        self.write(
+            wait=wait,
+            index='normalized.cassandra',
             docID=normalized["id"]['serviceID'],
             source=normalized['source'],
             url=normalized['id']['url'],
@@ -37,17 +50,56 @@ class CassandraProcessor(BaseProcessor):
             title=normalized['title'],
             tags=normalized['tags'],
             dateUpdated=normalized['dateUpdated'],
-            properties=json.dumps(normalized['properties'])
-        ).save()
+            properties=json.dumps(normalized['properties']),
+            normalizedDigest=content_digest(normalized)
+        )
 
     @events.logged(events.PROCESSING, 'raw.cassandra')
-    def process_raw(self, raw_doc):
-        self.send_to_database(**raw_doc.attributes).save()
+    def process_raw(self, raw_doc, wait=True):
+        self.write(wait=wait, index='raw.cassandra', rawDigest=content_digest(raw_doc), **raw_doc.attributes)
+
+    def write(self, docID, source, wait=True, index=None, **kwargs):
+        ''' Asynchronous writes are waited for before returning unless wait is False,
+        in which case they are waited for by flush. By then events.logged has
+        reported them completed, so flush dispatches their failures itself
+        '''
+        if not self.writer:
+            return self.send_to_database(docID, source, **kwargs)
+
+        if not wait:
+            self.deferred[(docID, source)] = index
+
+        self.writer.write(docID, source, **kwargs)
+        if wait:
+            self.flush()
+
+    def flush(self):
+        if not self.writer:
+            return
+
+        errors = self.writer.wait()
+        deferred, self.deferred = self.deferred, {}
+
+        if errors:
+            logger.error('{} documents could not be written to Cassandra'.format(len(errors)))
+            self.report_errors(errors, deferred)
+            raise errors[0][2]
+
+    def report_errors(self, errors, deferred):
+        if not settings.USE_FLUENTD:
+            return
+
+        for docID, source, exception in errors:
+            if (docID, source) in deferred:
+                events.dispatch(events.PROCESSING, events.FAILED, _index=deferred[(docID, source)],
+                                harvester=source, docID=docID, exception=exception)
 
     def send_to_database(self, docID, source, **kwargs):
         documents = DocumentModel.objects(docID=docID, source=source)
         if documents:
             document = documents[0]
+            if unchanged(dict(document), kwargs):
+                return document
             # Create new version, get UUID of new version, update
             versions = document.versions
             if document.url:
@@ -60,6 +112,131 @@ class CassandraProcessor(BaseProcessor):
             return DocumentModel.create(docID=docID, source=source, **kwargs)
 
 
+def unchanged(row, fields):
+    ''' True when fields carries a content digest
+    that matches the one already stored in row
+    '''
+    digests = [name for name in DIGEST_FIELDS if fields.get(name)]
+    return bool(digests) and all(row.get(name) == fields[name] for name in digests)
+
+
+class AsyncWriter(object):
+    '''
+    Performs the same versioned write as CassandraProcessor.send_to_database,
+    but with prepared statements executed asynchronously.
+
+    Each write reads the current row, copies it into the versions table if
+    it has been normalized before, then updates the row and appends the new
+    version's key in a single statement. Every statement touches one
+    partition. At most max_in_flight documents are written at once;
+    write blocks until a slot is free.
+
+    Versions are inserted without IF NOT EXISTS: their key is a fresh uuid4,
+    so the condition could never fail and would only add a Paxos round to
+    every versioned write. Like send_to_database, two concurrent writes of
+    the same document may both version the same old row.
+    '''
+
+    def __init__(self, session, max_in_flight):
+        self.session = session
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+
+        self.lock = threading.Condition()
+        self.in_flight = 0
+        self.errors = []
+
+        self.updates = {}
+        self.select = session.prepare(
+            'SELECT * FROM {} WHERE "docID" = ? AND "source" = ?'
+            .format(DocumentModel.column_family_name())
+        )
+        self.insert_version = session.prepare(
+            'INSERT INTO {} ("key", {}) VALUES (?, {})'.format(
+                VersionModel.column_family_name(),
+                ', '.join('"{}"'.format(name) for name in VERSIONED_FIELDS),
+                ', '.join('?' for _ in VERSIONED_FIELDS)
+            )
+        )
+
+    def prepare_update(self, fields):
+        ''' Raw and normalized documents set different columns,
+        so one update is prepared for each set of columns written
+        '''
+        if fields not in self.updates:
+            self.updates[fields] = self.session.prepare(
+                'UPDATE {} SET {}, "versions" = "versions" + ? '
+                'WHERE "docID" = ? AND "source" = ?'.format(
+                    DocumentModel.column_family_name(),
+                    ', '.join('"{}" = ?'.format(field) for field in fields)
+                )
+            )
+        return self.updates[fields]
+
+    def write(self, docID, source, **kwargs):
+        fields = tuple(sorted(kwargs.keys()))
+        # Statements are prepared here rather than in the driver's callbacks,
+        # which must never block
+        update = self.prepare_update(fields)
+        values = [kwargs[field] for field in fields]
+
+        self.slots.acquire()
+        with self.lock:
+            self.in_flight += 1
+
+        self.execute(self.select, (docID, source), self.on_select,
+                     docID, source, update, values, kwargs)
+
+    def execute(self, statement, params, callback, docID, source, *args):
+        try:
+            future = self.session.execute_async(statement, params)
+            future.add_callbacks(
+                callback, self.on_error,
+                callback_args=(docID, source) + args,
+                errback_args=(docID, source)
+            )
+        except Exception as e:
+            self.on_error(e, docID, source)
+
+    def on_select(self, rows, docID, source, update, values, kwargs):
+        if rows and unchanged(rows[0], kwargs):
+            self.finish()
+        elif rows and rows[0].get('url'):
+            key = uuid4()
+            version = [key] + [rows[0].get(field) for field in VERSIONED_FIELDS]
+            self.execute(self.insert_version, version, self.on_versioned,
+                         docID, source, update, values, [key])
+        else:
+            self.on_versioned(None, docID, source, update, values, [])
+
+    def on_versioned(self, _, docID, source, update, values, versions):
+        self.execute(update, values + [versions, docID, source], self.on_done, docID, source)
+
+    def on_done(self, _, docID, source):
+        self.finish()
+
+    def on_error(self, exception, docID, source):
+        logger.error('Could not write {} from {} to Cassandra: {!r}'.format(docID, source, exception))
+        with self.lock:
+            self.errors.append((docID, source, exception))
+        self.finish()
+
+    def finish(self):
+        with self.lock:
+            self.in_flight -= 1
+            self.lock.notify_all()
+        self.slots.release()
+
+    def wait(self):
+        ''' Blocks until every outstanding write has finished
+        and returns the writes that failed since the last wait
+        '''
+        with self.lock:
+            while self.in_flight:
+                self.lock.wait()
+            errors, self.errors = self.errors, []
+        return errors
+
+
 class DocumentModel(Model):
     '''
     Defines the schema for a metadata document in cassandra
@@ -92,6 +269,8 @@ class DocumentModel(Model):
 
     # Additional metadata
     versions = columns.List(columns.UUID)
+    rawDigest = columns.Text()
+    normalizedDigest = columns.Text()
 
 
 class VersionModel(Model):
@@ -126,3 +305,12 @@ class VersionModel(Model):
 
     # Additional metadata
     versions = columns.List(columns.UUID)
+    rawDigest = columns.Text()
+    normalizedDigest = columns.Text()
+
+
+# Columns holding scrapi.util.content_digest of the raw and normalized document
+DIGEST_FIELDS = ('rawDigest', 'normalizedDigest')
+
+# Every column a version copies from its document
+VERSIONED_FIELDS = DocumentModel._columns.keys()
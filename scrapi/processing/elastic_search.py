@@ -1,10 +1,15 @@
 import logging
+import threading
 
+from elasticsearch import helpers
 from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import NotFoundError
 from elasticsearch.exceptions import ConnectionError
+from elasticsearch.helpers import BulkIndexError
 
+from scrapi import events
 from scrapi import settings
+from scrapi.util import content_digest
 from scrapi.processing.base import BaseProcessor
 
 
@@ -36,24 +41,138 @@ except ConnectionError:
 class ElasticsearchProcessor(BaseProcessor):
     NAME = 'elasticsearch'
 
+    def __init__(self):
+        self.buffer = []
+        self.timer = None
+        # The buffer is also flushed from the timer's thread
+        self.lock = threading.RLock()
+
     def process_normalized(self, raw_doc, normalized):
-        normalized['dateUpdated'] = self.version_dateUpdated(normalized)
-        data = {
-            key: value for key, value in normalized.attributes.items()
-            if key in settings.FRONTEND_KEYS
-        }
+        if settings.ELASTIC_BULK:
+            with self.lock:
+                self.buffer.append(normalized)
+                if len(self.buffer) >= settings.ELASTIC_BULK_SIZE:
+                    self.flush()
+                elif not self.timer:
+                    self.start_timer()
+            return
+
+        digest = content_digest(normalized)
+        old_doc = self.get_indexed(normalized)
+
+        if old_doc and old_doc.get('contentDigest') == digest:
+            return  # Already indexed with the same content
 
         es.index(
-            body=data,
+            body=self.index_data(normalized, old_doc, digest),
             refresh=True,
             index=settings.ELASTIC_INDEX,
             doc_type=normalized['source'],
             id=normalized['id']['serviceID'],
         )
 
-    def version_dateUpdated(self, normalized):
+    def start_timer(self):
+        ''' Flushes the buffer ELASTIC_BULK_INTERVAL seconds after its first document,
+        whether or not any more documents arrive to fill it
+        '''
+        self.timer = threading.Timer(settings.ELASTIC_BULK_INTERVAL, self.flush_idle)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush_idle(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Could not flush buffered documents to Elasticsearch')
+
+    def flush(self):
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+
+            documents, self.buffer = self.buffer, []
+            if documents:
+                self.bulk_index(documents)
+
+    def bulk_index(self, documents):
+        old_docs = self.bulk_get_indexed(documents)
+
+        actions = []
+        for normalized in documents:
+            key = self.document_key(normalized)
+            digest = content_digest(normalized)
+            old_doc = old_docs.get(key)
+
+            if old_doc and old_doc.get('contentDigest') == digest:
+                continue
+
+            # Later copies of a document within this flush keep the first one's date
+            old_docs.setdefault(key, {'dateUpdated': normalized['dateUpdated']})
+
+            actions.append({
+                '_index': settings.ELASTIC_INDEX,
+                '_type': normalized['source'],
+                '_id': normalized['id']['serviceID'],
+                '_source': self.index_data(normalized, old_doc, digest)
+            })
+
+        if not actions:
+            return
+
+        _, errors = helpers.bulk(es, actions)
+        if errors:
+            self.report_errors(errors)
+            raise BulkIndexError('{} document(s) failed to index'.format(len(errors)), errors)
+
+    def report_errors(self, errors):
+        for error in errors:
+            _, item = error.items()[0]
+            logger.error('Could not index {}/{}: {}'.format(item.get('_type'), item.get('_id'), item.get('error')))
+
+            if settings.USE_FLUENTD:
+                events.dispatch(events.PROCESSING, events.FAILED, _index='normalized.elasticsearch',
+                                harvester=item.get('_type'), docID=item.get('_id'), exception=item.get('error'))
+
+    def index_data(self, normalized, old_doc, digest):
+        data = {
+            key: value for key, value in normalized.attributes.items()
+            if key in settings.FRONTEND_KEYS
+        }
+        data['dateUpdated'] = self.version_dateUpdated(normalized, old_doc)
+        data['contentDigest'] = digest
+        return data
+
+    def document_key(self, normalized):
+        return (normalized['source'], normalized['id']['serviceID'])
+
+    def bulk_get_indexed(self, documents):
+        ''' The bulk equivalent of get_indexed, fetches the dateUpdated and
+        contentDigest of every document already in the index with a single mget
+        '''
+        keys = list({self.document_key(normalized) for normalized in documents})
+
+        old_docs = es.mget(body={
+            'docs': [
+                {
+                    '_index': settings.ELASTIC_INDEX,
+                    '_type': source,
+                    '_id': doc_id,
+                    '_source': ['dateUpdated', 'contentDigest']
+                }
+                for source, doc_id in keys
+            ]
+        })['docs']
+
+        return {
+            key: old_doc['_source']
+            for key, old_doc in zip(keys, old_docs)
+            if old_doc.get('found')
+        }
+
+    def get_indexed(self, normalized):
         try:
-            old_doc = es.get_source(
+            return es.get_source(
                 index=settings.ELASTIC_INDEX,
                 doc_type=normalized['source'],
                 id=normalized['id']['serviceID'],
@@ -62,8 +181,9 @@ class ElasticsearchProcessor(BaseProcessor):
             # Normally I don't like exception-driven logic,
             # but this was the best way to handle missing
             # types, indices and documents together
-            date = normalized['dateUpdated']
-        else:
-            date = old_doc['dateUpdated']
+            return None
 
-        return date
+    def version_dateUpdated(self, normalized, old_doc):
+        if old_doc:
+            return old_doc['dateUpdated']
+        return normalized['dateUpdated']
@@ -11,5 +11,7 @@ class StorageProcessor(BaseProcessor):
         store.store_normalized(raw_doc, normalized, overwrite=overwrite, is_push=is_push)
 
     @events.logged(events.PROCESSING, 'normalized.storage')
-    def process_raw(self, raw_doc, is_push=False):
-        store.store_raw(raw_doc, is_push=is_push)
+    def process_raw(self, raw_doc, is_push=False, claimed=False):
+        # Claimed documents were archived when they were checked in
+        if not claimed:
+            store.store_raw(raw_doc, is_push=is_push)
@@ -0,0 +1,130 @@
+"""Sampled cProfile profiles of the tasks in scrapi.tasks.
+
+With PROFILE_TASKS on, PROFILE_SAMPLE_RATE of task runs are profiled. The
+profiles are added up for each task and harvester, and every
+PROFILE_SAVE_INTERVAL seconds each worker process writes them to
+RECORD_DIRECTORY/profiles/<task>/<harvester>/<host>-<pid>.prof, which
+`invoke profiles` merges to print the hotspots.
+"""
+
+from __future__ import absolute_import
+
+import os
+import glob
+import time
+import pstats
+import random
+import socket
+import logging
+import cProfile
+
+from celery import signals
+
+from scrapi import settings
+from scrapi.util import make_dir
+from scrapi.linter.document import BaseDocument
+
+
+logger = logging.getLogger(__name__)
+
+# Harvester used for tasks that are not about any one harvester
+UNKNOWN = 'unknown'
+
+_running = {}  # task_id -> (Profile, task name, harvester)
+_stats = {}  # (task name, harvester) -> pstats.Stats
+_last_save = [time.time()]
+
+
+def profile_directory():
+    return os.path.join(settings.RECORD_DIRECTORY, 'profiles')
+
+
+# :: Tuple -> Dict -> Str
+def harvester_of(args, kwargs):
+    ''' The harvester a task was run for, from its harvester_name or the
+    source of the first document it was given
+    '''
+    if kwargs.get('harvester_name'):
+        return kwargs['harvester_name']
+
+    for arg in args:
+        if isinstance(arg, (list, tuple)) and arg:
+            arg = arg[0]
+        if isinstance(arg, BaseDocument) and arg.get('source'):
+            return arg['source']
+
+    for arg in args:
+        if isinstance(arg, basestring):
+            return arg
+
+    return UNKNOWN
+
+
+def task_started(task_id=None, task=None, args=(), kwargs=None, **_):
+    # Only one profiler can run at a time, tasks run eagerly within tasks are left out
+    if not settings.PROFILE_TASKS or _running or random.random() >= settings.PROFILE_SAMPLE_RATE:
+        return
+
+    profile = cProfile.Profile()
+    _running[task_id] = (profile, task.name, harvester_of(args or (), kwargs or {}))
+    profile.enable()
+
+
+def task_finished(task_id=None, **_):
+    try:
+        profile, name, harvester = _running.pop(task_id)
+    except KeyError:
+        return
+
+    profile.disable()
+
+    key = (name, harvester)
+    if key in _stats:
+        _stats[key].add(profile)
+    else:
+        _stats[key] = pstats.Stats(profile)
+
+    if time.time() - _last_save[0] >= settings.PROFILE_SAVE_INTERVAL:
+        save()
+
+signals.task_prerun.connect(task_started)
+signals.task_postrun.connect(task_finished)
+
+
+def save(*args, **kwargs):
+    _last_save[0] = time.time()
+    filename = '{}-{}.prof'.format(socket.gethostname(), os.getpid())
+
+    for (name, harvester), stats in _stats.items():
+        path = os.path.join(profile_directory(), name, harvester, filename)
+        try:
+            make_dir(os.path.dirname(path))
+            # Write then rename so that merge never sees half a profile
+            stats.dump_stats(path + '.tmp')
+            os.rename(path + '.tmp', path)
+        except (IOError, OSError):
+            logger.exception('Could not save the profile of {} for {}'.format(name, harvester))
+
+signals.worker_process_shutdown.connect(save)
+
+
+def reset(*args, **kwargs):
+    ''' Forked workers start from nothing rather than their parent's profiles '''
+    _running.clear()
+    _stats.clear()
+    _last_save[0] = time.time()
+
+signals.worker_process_init.connect(reset)
+
+
+# :: Maybe Str -> Maybe Str -> Maybe pstats.Stats
+def merge(task=None, harvester=None):
+    ''' Every saved profile of task for harvester added together,
+    of every task or harvester when they are not given
+    '''
+    pattern = os.path.join(profile_directory(), task or '*', harvester or '*', '*.prof')
+    paths = sorted(glob.glob(pattern))
+
+    if not paths:
+        return None
+    return pstats.Stats(*paths)
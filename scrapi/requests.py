@@ -0,0 +1,106 @@
+"""A drop in replacement for requests.get and friends, for harvesters.
+
+Requests to each host share a pooled keep-alive session, get a default
+timeout, and are retried with exponential backoff on connection errors and
+retryable statuses, honoring Retry-After. When RECORD_HTTP_TRANSACTIONS is
+on every request gets a fresh connection so that vcr sees all of them.
+"""
+
+from __future__ import absolute_import
+
+import os
+import time
+import logging
+import threading
+from urlparse import urlparse
+from email.utils import parsedate_tz, mktime_tz
+
+import requests
+from requests import exceptions  # noqa
+
+from scrapi import settings
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions = {}
+_sessions_pid = None
+_lock = threading.Lock()
+
+
+def get_session(url):
+    global _sessions_pid
+
+    host = urlparse(url).netloc
+
+    with _lock:
+        # Pooled connections cannot be shared with forked worker processes
+        if _sessions_pid != os.getpid():
+            _sessions.clear()
+            _sessions_pid = os.getpid()
+
+        if host not in _sessions:
+            session = requests.Session()
+            session.headers['Accept-Encoding'] = 'gzip, deflate'
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=settings.REQUESTS_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[host] = session
+
+        return _sessions[host]
+
+
+def retry_after(response):
+    """ The delay in seconds asked for by response's Retry-After header, if any """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        date = parsedate_tz(value)
+        return date and max(mktime_tz(date) - time.time(), 0)
+
+
+def backoff(attempt):
+    return settings.REQUESTS_BACKOFF * 2 ** attempt
+
+
+def request(method, url, **kwargs):
+    kwargs.setdefault('timeout', settings.REQUESTS_TIMEOUT)
+
+    if settings.RECORD_HTTP_TRANSACTIONS:
+        send = requests.request
+    else:
+        send = get_session(url).request
+
+    for attempt in range(settings.REQUESTS_RETRIES + 1):
+        last_attempt = attempt == settings.REQUESTS_RETRIES
+
+        try:
+            response = send(method, url, **kwargs)
+        except (exceptions.ConnectionError, exceptions.Timeout) as e:
+            if last_attempt:
+                raise
+            delay = backoff(attempt)
+            logger.warning('{} {} failed ({}), retrying in {}s'.format(method, url, e, delay))
+        else:
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+            delay = retry_after(response)
+            if delay is None:
+                delay = backoff(attempt)
+            logger.warning('{} {} returned {}, retrying in {}s'.format(method, url, response.status_code, delay))
+
+        time.sleep(min(delay, settings.REQUESTS_MAX_BACKOFF))
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
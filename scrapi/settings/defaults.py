@@ -6,20 +6,115 @@ STORAGE_METHOD = 'disk'
 ARCHIVE_DIRECTORY = 'archive/'
 RECORD_DIRECTORY = 'records'
 
+# Where `invoke benchmark` and `invoke benchmark_pipeline` save their results
+BENCHMARK_DIRECTORY = 'benchmarks'
+
+# Size in bytes at which the segment storage method starts a new segment file
+SEGMENT_SIZE = 256 * 1024 * 1024
+
+# Compress archived documents with 'zlib' or 'gzip', None to store them as is.
+# Reads detect compression per document, so archives may be mixed
+STORAGE_COMPRESSION = None
+STORAGE_COMPRESSION_LEVEL = 6
+
+# Path of a SQLite catalog of the archive, kept up to date as documents are
+# stored so iter_raws does not have to walk the archive. Build one for an
+# existing archive with `invoke rebuild_catalog`
+ARCHIVE_CATALOG = None
+
 CELERY_EAGER_PROPAGATES_EXCEPTIONS = True
 
 RECORD_HTTP_TRANSACTIONS = False
 
+# Start normalizing harvested documents in chunks of HARVEST_CHUNK_SIZE
+# while the rest of the harvest is still being downloaded
+STREAM_HARVESTS = False
+HARVEST_CHUNK_SIZE = 100
+
+# Write raw documents to storage once, as soon as they are harvested, and
+# only pass a RawDocumentClaim through the broker. Every worker must be
+# able to read the configured storage.
+CLAIM_CHECK_RAW = False
+
+# When set, begin_normalization sends documents through normalize_batch and
+# friends this many at a time instead of as one task chain per document
+NORMALIZE_BATCH_SIZE = None
+
+# Requests made by harvesters through scrapi.requests time out after
+# REQUESTS_TIMEOUT seconds and are retried REQUESTS_RETRIES times, backing off
+# exponentially from REQUESTS_BACKOFF seconds unless told to Retry-After
+REQUESTS_TIMEOUT = 60
+REQUESTS_RETRIES = 3
+REQUESTS_BACKOFF = 2
+REQUESTS_MAX_BACKOFF = 120
+REQUESTS_POOL_SIZE = 10
+
+# Studies fetched at once and requests per second for the ClinicalTrials.gov harvester
+CLINICALTRIALS_WORKERS = 4
+CLINICALTRIALS_RATE = 4
+
+# How many parsed contributor names util.parse_contributor keeps around
+NAME_CACHE_SIZE = 10000
+
 NORMALIZED_PROCESSING = ['storage']
 RAW_PROCESSING = ['storage']
 
+# Seconds the 'standin' processor pretends each write and each flush takes
+STANDIN_LATENCY = 0
+STANDIN_FLUSH_LATENCY = 0
+
 SENTRY_DSN = None
 
+# Record per harvester and per stage latency histograms and documents/sec,
+# see scrapi.metrics. With METRICS_DIRECTORY set every process saves its
+# metrics there every METRICS_SAVE_INTERVAL seconds, so that the server and
+# `invoke metrics` can report on all of the workers together. Snapshots
+# not saved for METRICS_MAX_AGE seconds are deleted.
+COLLECT_METRICS = False
+METRICS_DIRECTORY = None
+METRICS_SAVE_INTERVAL = 30
+METRICS_MAX_AGE = 24 * 60 * 60
+
+# Profile PROFILE_SAMPLE_RATE of task runs with cProfile, saving the profiles
+# of each task and harvester to RECORD_DIRECTORY every PROFILE_SAVE_INTERVAL
+# seconds. `invoke profiles` prints where the time went.
+PROFILE_TASKS = False
+PROFILE_SAMPLE_RATE = 0.01
+PROFILE_SAVE_INTERVAL = 300
+
 USE_FLUENTD = False
 FLUENTD_ARGS = {
     'tag': 'app.scrapi'
 }
 
+# Queue events in memory and send them to fluentd in batches of
+# FLUENTD_BATCH_SIZE, or every FLUENTD_FLUSH_INTERVAL seconds, from a
+# background thread. Once FLUENTD_QUEUE_SIZE events are waiting new events
+# are dropped ('drop_newest'), replace the oldest ('drop_oldest'), or wait
+# up to FLUENTD_BLOCK_TIMEOUT seconds for room ('block').
+FLUENTD_BUFFERED = False
+FLUENTD_QUEUE_SIZE = 10000
+FLUENTD_BATCH_SIZE = 100
+FLUENTD_FLUSH_INTERVAL = 1.0
+FLUENTD_OVERFLOW = 'drop_newest'
+FLUENTD_BLOCK_TIMEOUT = 1.0
+FLUENTD_SHUTDOWN_TIMEOUT = 5.0
+
+# Buffer normalized documents and send them to Elasticsearch with the _bulk
+# API every ELASTIC_BULK_SIZE documents, at most ELASTIC_BULK_INTERVAL seconds
+# after a document is buffered, or at the end of a batch. Documents become searchable on the index's
+# own refresh interval rather than immediately.
+ELASTIC_BULK = False
+ELASTIC_BULK_SIZE = 500
+ELASTIC_BULK_INTERVAL = 10
+
+# Write to Cassandra with prepared statements executed asynchronously,
+# with at most CASSANDRA_MAX_IN_FLIGHT documents being written at a time.
+# Only the documents of a batch (NORMALIZE_BATCH_SIZE) overlap, a single
+# document's writes are waited for before its task completes.
+CASSANDRA_ASYNC_WRITES = False
+CASSANDRA_MAX_IN_FLIGHT = 64
+
 SCRAPI_URL = 'http://173.255.232.219'
 
 ES_SEARCH_MAPPING = {
@@ -1,19 +1,24 @@
+from __future__ import absolute_import
+
 import logging
 from base64 import b64decode
-from datetime import datetime
+from datetime import datetime, timedelta
 
+import pytz
 import requests
 from celery import Celery
 from dateutil import parser
 
 from scrapi import util
 from scrapi import events
+from scrapi import metrics
 from scrapi import settings
+from scrapi import profiling  # noqa
 from scrapi import processing
 from scrapi.util import timestamp
 from scrapi.util.storage import store
 from scrapi.util import import_harvester
-from scrapi.linter.document import RawDocument
+from scrapi.linter.document import RawDocument, RawDocumentClaim
 
 
 app = Celery()
@@ -27,6 +32,10 @@ logger = logging.getLogger(__name__)
 def run_harvester(harvester_name, days_back=1):
     logger.info('Running harvester "{}"'.format(harvester_name))
 
+    if settings.STREAM_HARVESTS:
+        stream_harvest.delay(harvester_name, timestamp(), days_back=days_back)
+        return
+
     normalization = begin_normalization.s(harvester_name)
     start_harvest = harvest.si(harvester_name, timestamp(), days_back=days_back)
 
@@ -44,13 +53,73 @@ def harvest(harvester_name, job_created, days_back=1):
     with util.maybe_recorded(harvester_name):
         result = harvester.harvest(days_back=days_back)
 
-    # result is a list of all of the RawDocuments harvested
-    return result, {
+    timestamps = {
         'harvestFinished': timestamp(),
         'harvestTaskCreated': job_created,
         'harvestStarted': harvest_started,
     }
 
+    metrics.record_harvest(harvester_name, timestamps, len(result))
+
+    if settings.CLAIM_CHECK_RAW:
+        result = check_in(result, timestamps)
+
+    # result is a list of all of the RawDocuments (or their claims) harvested
+    return result, timestamps
+
+
+@app.task
+@events.logged(events.HARVESTER_RUN)
+def stream_harvest(harvester_name, job_created, days_back=1):
+    '''Harvests the same documents as harvest, but starts normalizing them
+    every HARVEST_CHUNK_SIZE documents rather than once the harvest is done.
+    Each chunk's harvestFinished is the time that chunk was completed.
+    With RECORD_HTTP_TRANSACTIONS on the harvest is not overlapped.
+    '''
+    harvest_started = timestamp()
+    harvester = import_harvester(harvester_name)
+    logger.info('Harvester "{}" has begun streaming'.format(harvester_name))
+
+    # Harvesters without a lazy iter_harvest still work, just without overlap
+    iter_harvest = getattr(harvester, 'iter_harvest', harvester.harvest)
+
+    if settings.RECORD_HTTP_TRANSACTIONS:
+        # Only the harvest's own requests belong in its cassette, so while
+        # recording the whole harvest is done before anything is normalized
+        with util.maybe_recorded(harvester_name):
+            raw_docs = list(iter_harvest(days_back=days_back))
+    else:
+        raw_docs = iter_harvest(days_back=days_back)
+
+    # Each chunk is measured from the end of the one before it, only the first waited in the queue
+    chunk_timestamps = {'harvestTaskCreated': job_created, 'harvestStarted': harvest_started}
+
+    for chunk in util.chunked(raw_docs, settings.HARVEST_CHUNK_SIZE):
+        timestamps = {
+            'harvestFinished': timestamp(),
+            'harvestTaskCreated': job_created,
+            'harvestStarted': harvest_started,
+        }
+
+        metrics.record_harvest(harvester_name, dict(chunk_timestamps, harvestFinished=timestamps['harvestFinished']), len(chunk))
+        chunk_timestamps = {'harvestStarted': timestamps['harvestFinished']}
+
+        if settings.CLAIM_CHECK_RAW:
+            chunk = check_in(chunk, timestamps)
+
+        begin_normalization((chunk, timestamps), harvester_name)
+
+
+def check_in(raw_docs, timestamps):
+    '''Writes each raw document to storage and returns
+    the claims that are sent to the other tasks in their place
+    '''
+    claims = []
+    for raw in raw_docs:
+        raw['timestamps'] = dict(timestamps)
+        claims.append(store.claim_check(raw))
+    return claims
+
 
 @app.task
 def begin_normalization((raw_docs, timestamps), harvester_name):
@@ -60,6 +129,12 @@ def begin_normalization((raw_docs, timestamps), harvester_name):
     '''
     logger.info('Normalizing {} documents for harvester "{}"'
                 .format(len(raw_docs), harvester_name))
+
+    if settings.NORMALIZE_BATCH_SIZE:
+        for batch in util.chunked(raw_docs, settings.NORMALIZE_BATCH_SIZE):
+            spawn_batch(batch, timestamps, harvester_name)
+        return
+
     # raw is a single raw document
     for raw in raw_docs:
         spawn_tasks(raw, timestamps, harvester_name)
@@ -76,9 +151,79 @@ def spawn_tasks(raw, timestamps, harvester_name):
         process_raw.delay(raw)
 
 
+def spawn_batch(raw_docs, timestamps, harvester_name):
+    task_created = timestamp()
+    for raw in raw_docs:
+        raw['timestamps'] = dict(timestamps, normalizeTaskCreated=task_created)
+
+        if not settings.USE_FLUENTD:
+            continue
+
+        for event in (events.NORMALIZATION, events.PROCESSING):
+            events.dispatch(event, events.CREATED,
+                            harvester=harvester_name, docID=raw['docID'])
+
+    chain = (normalize_batch.si(raw_docs, harvester_name) |
+             process_normalized_batch.s(raw_docs))
+
+    chain.apply_async()
+    process_raw_batch.delay(raw_docs)
+
+
+def isolated(task, *args, **kwargs):
+    '''Runs task in the current worker and returns None if it fails,
+    so that one bad document cannot fail the rest of its batch.
+    The failure itself has already been dispatched by events.logged.
+    '''
+    try:
+        return task(*args, **kwargs)
+    except Exception:
+        logger.exception('{} failed within a batch'.format(task.name))
+        return None
+
+
+@app.task
+def normalize_batch(raw_docs, harvester_name):
+    '''Returns a list of normalized documents in the same order as raw_docs,
+    with None for any document that was skipped or failed to normalize
+    '''
+    return [isolated(normalize, raw, harvester_name) for raw in raw_docs]
+
+
+def deferred(kwargs):
+    ''' Leaves the batch's Cassandra writes in flight for
+    flush_processors to wait on together at the end of the batch
+    '''
+    return dict(kwargs, cassandra=dict(kwargs.get('cassandra', {}), wait=False))
+
+
+@app.task
+def process_normalized_batch(normalized_docs, raw_docs, **kwargs):
+    kwargs = deferred(kwargs)
+    for normalized, raw in zip(normalized_docs, raw_docs):
+        isolated(process_normalized, normalized, raw, **kwargs)
+
+    processing.flush_processors()
+
+
+@app.task
+def process_raw_batch(raw_docs, **kwargs):
+    kwargs = deferred(kwargs)
+    for raw in raw_docs:
+        isolated(process_raw, raw, **kwargs)
+
+    processing.flush_processors()
+
+
 @app.task
 @events.logged(events.PROCESSING, 'raw')
 def process_raw(raw_doc, **kwargs):
+    if isinstance(raw_doc, RawDocumentClaim):
+        kwargs['storage'] = dict(kwargs.get('storage', {}), claimed=True)
+        # Storage already has the doc, so it is only read back for the others
+        if any(p != 'storage' for p in settings.RAW_PROCESSING):
+            raw_doc = store.redeem(raw_doc)
+
     processing.process_raw(raw_doc, kwargs)
 
 
@@ -88,12 +233,16 @@ def normalize(raw_doc, harvester_name):
     normalized_started = timestamp()
     harvester = import_harvester(harvester_name)
 
+    if isinstance(raw_doc, RawDocumentClaim):
+        raw_doc = store.redeem(raw_doc)
+
     normalized = harvester.normalize(raw_doc)
 
     if not normalized:
         raise events.Skip('Did not normalize document with id {}'.format(raw_doc['docID']))
 
     normalized['timestamps'] = util.stamp_from_raw(raw_doc, normalizeStarted=normalized_started)
+    metrics.record_normalize(harvester_name, normalized['timestamps'])
     normalized['raw'] = util.build_raw_url(raw_doc, normalized)
 
     return normalized  # returns a single normalized document
@@ -128,12 +277,12 @@ def check_archive(harvester_name, reprocess, days_back=None):
     extras = {
         'overwrite': True
     }
-    for raw_path in store.iter_raws(harvester_name, include_normalized=reprocess):
-        date = parser.parse(raw_path.split('/')[-2])
-
-        if (days_back and (datetime.now() - date).days > days_back):
-            continue
+    since = None
+    if days_back:
+        since = pytz.utc.localize(datetime.utcnow()) - timedelta(days=days_back)
 
+    for raw_path in store.iter_raws(harvester_name, since=since, include_normalized=reprocess):
+        date = parser.parse(raw_path.split('/')[-2])
         timestamp = date.isoformat()
 
         raw_file = store.get_as_string(raw_path)
@@ -1,13 +1,17 @@
 import os
+import json
 import errno
 import logging
 import importlib
+from hashlib import sha1
 from base64 import b64encode
 from datetime import datetime
+from collections import OrderedDict
 from contextlib import contextmanager
 
 import vcr
 import pytz
+from nameparser import HumanName
 
 from scrapi import settings
 
@@ -45,6 +49,19 @@ def copy_to_unicode(element, encoding='utf-8'):
         return unicode(element, encoding=encoding)
 
 
+def chunked(iterable, size):
+    """ Yields lists of at most size items from iterable, without
+    consuming more of it than is needed for the current list """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
 def stamp_from_raw(raw_doc, **kwargs):
     kwargs['normalizeFinished'] = timestamp()
     stamps = raw_doc['timestamps']
@@ -63,6 +80,94 @@ def build_raw_url(raw, normalized):
     )
 
 
+# Fields that change every time a document is harvested, even if it has not
+DIGEST_EXCLUDED_FIELDS = ('timestamps', 'raw')
+
+
+def content_digest(document):
+    """ A stable hash of a raw or normalized document's content, which may
+    also be given as a plain dict. Raw documents are hashed by their doc,
+    normalized documents by every field not in DIGEST_EXCLUDED_FIELDS """
+    attributes = getattr(document, 'attributes', document)
+    content = attributes.get('doc')
+
+    if content is None:
+        content = json.dumps({
+            key: value for key, value in attributes.items()
+            if key not in DIGEST_EXCLUDED_FIELDS
+        }, sort_keys=True)
+    elif isinstance(content, unicode):
+        content = content.encode('utf-8')
+
+    return sha1(content).hexdigest().decode('utf-8')
+
+
+class LRUCache(object):
+    """ A dict of at most maxsize items that evicts the least recently used
+    item first, counting how often lookups hit and miss """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        try:
+            value = self.items.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.items[key] = value
+        return value
+
+    def put(self, key, value):
+        self.items.pop(key, None)
+        self.items[key] = value
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        self.items.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.items),
+            'maxsize': self.maxsize,
+        }
+
+
+name_cache = LRUCache(settings.NAME_CACHE_SIZE)
+
+
+def parse_contributor(name, email=u'', orcid=u''):
+    """ The standard contributor dict for name, as parsed by HumanName.
+    Parsed names are cached, see name_cache.info() for how well. """
+
+    # Plain strings only, lxml's smart strings would keep their whole tree cached
+    name = unicode(name) if isinstance(name, unicode) else str(name)
+
+    parts = name_cache.get(name)
+    if parts is None:
+        human = HumanName(name)
+        parts = {
+            'prefix': human.title,
+            'given': human.first,
+            'middle': human.middle,
+            'family': human.last,
+            'suffix': human.suffix,
+        }
+        name_cache.put(name, parts)
+
+    return dict(parts, email=email, ORCID=orcid)
+
+
 @contextmanager
 def maybe_recorded(file_name):
     # TODO put into cassandra
@@ -9,7 +9,7 @@ __all__ = []
 
 for mod in os.listdir(os.path.dirname(__file__)):
     root, ext = os.path.splitext(mod)
-    if ext == '.py' and root not in ['__init__', 'base']:
+    if ext == '.py' and root not in ['__init__', 'base', 'catalog']:
         __all__.append(root)
 
 
@@ -1,9 +1,47 @@
 import os
 import json
-from base64 import b64encode
+import zlib
+from base64 import b64encode, b64decode
 
 from scrapi import settings
-from scrapi.util import make_dir
+from scrapi.util import content_digest
+from scrapi.linter.document import RawDocument, RawDocumentClaim
+from scrapi.util.storage.catalog import get_catalog, utc
+
+
+# zlib accepts wbits offsets of 16 to write a gzip header and 32 to detect either on read
+WBITS = {
+    'zlib': zlib.MAX_WBITS,
+    'gzip': 16 + zlib.MAX_WBITS,
+}
+
+
+# :: Str -> Str
+def compress(string):
+    if not settings.STORAGE_COMPRESSION:
+        return string
+
+    if isinstance(string, unicode):
+        string = string.encode('utf-8')
+
+    compressor = zlib.compressobj(
+        settings.STORAGE_COMPRESSION_LEVEL,
+        zlib.DEFLATED,
+        WBITS[settings.STORAGE_COMPRESSION]
+    )
+    return compressor.compress(string) + compressor.flush()
+
+
+# :: Str -> Str
+def decompress(string):
+    # Anything without a gzip or zlib header was stored uncompressed
+    if string[:2] != '\x1f\x8b' and string[:1] != '\x78':
+        return string
+
+    try:
+        return zlib.decompress(string, 32 + zlib.MAX_WBITS)
+    except zlib.error:
+        return string
 
 
 class BaseStorage(object):
@@ -13,18 +51,52 @@ class BaseStorage(object):
     def _store(string, path):
         raise NotImplementedError('No store method')
 
-    # :: Str -> Bool -> [RawDocument]
-    def iter_raws(source, include_normalized=False):
-        raise NotImplementedError('No iter raws method')
+    # :: Str -> [(Str, Bool)]
+    def _scan(self, source):
+        raise NotImplementedError('No scan method')
+
+    # :: Str -> Str
+    def _read(self, path):
+        raise NotImplementedError('No read method')
+
+    # :: Str -> Str -> Bool -> Nothing
+    def _write(self, string, path, overwrite=False):
+        self._store(compress(string), path, overwrite=overwrite)
 
     # :: Str -> Str
     def get_as_string(self, path):
-        raise NotImplementedError('No get as string method')
+        return decompress(self._read(path))
 
     # :: Str -> Dict
     def get_as_json(self, path):
         return json.loads(self.get_as_string(path))
 
+    # :: Str -> Maybe Datetime -> Bool -> [Str]
+    def iter_raws(self, source, since=None, include_normalized=False):
+        if settings.ARCHIVE_CATALOG:
+            catalog = get_catalog(settings.ARCHIVE_CATALOG)
+            return catalog.iter_raws(source, since=since, include_normalized=include_normalized)
+
+        return self._walk_raws(source, since=since, include_normalized=include_normalized)
+
+    # :: Str -> Maybe Datetime -> Bool -> [Str]
+    def _walk_raws(self, source, since=None, include_normalized=False):
+        since = since and utc(since)
+        for path, normalized in self._scan(source):
+            if normalized and not include_normalized:
+                continue
+            if since and utc(path.split('/')[-2]) < since:
+                continue
+            yield path
+
+    # :: Str -> Nothing
+    def rebuild_catalog(self, source):
+        entries = (
+            (b64decode(path.split('/')[-3]).decode('utf-8'), path.split('/')[-2], path, normalized)
+            for path, normalized in self._scan(source)
+        )
+        get_catalog(settings.ARCHIVE_CATALOG).rebuild(source, entries)
+
     # :: Str -> Str
     def _build_path(self, raw_doc):
         path = [
@@ -33,38 +105,88 @@ class BaseStorage(object):
             b64encode(raw_doc['docID']),
             raw_doc['timestamps']['harvestFinished']
         ]
-        path = os.path.join(*path)
-        make_dir(path)
-
-        return path
+        return os.path.join(*path)
 
     # :: NormalizedDocument -> Nothing
     def store_normalized(self, raw_doc, document, overwrite=False, is_push=False):
-
         path = self._build_path(raw_doc)
         path = os.path.join(path, 'normalized.json')
-        self._store(json.dumps(document.attributes), path, overwrite=overwrite)
 
-    # :: RawDocument -> Nothing
-    def store_raw(self, document, is_push=False):
+        # Reprocessing an unchanged document would rewrite the same content
+        if overwrite and self.get_digest(path) == content_digest(document):
+            self._catalog_normalized(raw_doc)
+            return
+
+        self._write(json.dumps(document.attributes), path, overwrite=overwrite)
+        self._catalog_normalized(raw_doc)
+
+    # :: RawDocument -> Bool -> Str
+    def _raw_name(self, document, is_push=False):
         if is_push:
             file_manifest = {'fileFormat': 'json'}
         else:
             file_manifest = settings.MANIFESTS[document['source']]
 
+        return 'raw.{}'.format(file_manifest['fileFormat'])
+
+    # :: RawDocument -> Nothing
+    def store_raw(self, document, is_push=False):
         manifest = {
             'harvestedTimestamp': document['timestamps']['harvestFinished'],
             'source': document['source']
         }
 
-        doc_name = 'raw.{}'.format(file_manifest['fileFormat'])
+        doc_name = self._raw_name(document, is_push=is_push)
         path = self._build_path(document)
 
         self.update_manifest(path, manifest)
 
         path = os.path.join(path, doc_name)
 
-        self._store(document.get('doc'), path)
+        self._write(document.get('doc'), path)
+
+        if settings.ARCHIVE_CATALOG:
+            get_catalog(settings.ARCHIVE_CATALOG).add_raw(
+                document['source'],
+                document['docID'],
+                document['timestamps']['harvestFinished'],
+                path
+            )
+
+    # :: RawDocument -> Nothing
+    def _catalog_normalized(self, raw_doc):
+        if settings.ARCHIVE_CATALOG:
+            get_catalog(settings.ARCHIVE_CATALOG).add_normalized(
+                raw_doc['source'],
+                raw_doc['docID'],
+                raw_doc['timestamps']['harvestFinished']
+            )
+
+    # :: RawDocument -> RawDocumentClaim
+    def claim_check(self, document):
+        self.store_raw(document)
+
+        return RawDocumentClaim({
+            key: value for key, value in document.attributes.items()
+            if key != 'doc'
+        }, trusted=True)
+
+    # :: RawDocumentClaim -> RawDocument
+    def redeem(self, claim):
+        path = os.path.join(self._build_path(claim), self._raw_name(claim))
+
+        attributes = dict(claim.attributes)
+        attributes['doc'] = self.get_as_string(path)
+
+        # The claim was linted and doc is read back exactly as it was stored
+        return RawDocument(attributes, trusted=True)
+
+    # :: Str -> Str
+    def get_digest(self, path):
+        try:
+            return content_digest(self.get_as_json(path))
+        except Exception:  # TODO Make this more specific
+            return None
 
     # :: RawDocument -> Dict -> Nothing
     def update_manifest(self, path, fields):
@@ -75,4 +197,4 @@ class BaseStorage(object):
             manifest = {}
 
         manifest.update(fields)
-        self._store(json.dumps(manifest), path, overwrite=True)
+        self._write(json.dumps(manifest), path, overwrite=True)
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+
+import pytz
+from dateutil import parser
+
+from scrapi.util import make_dir
+
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS documents (
+        source TEXT NOT NULL,
+        docID TEXT NOT NULL,
+        harvestFinished TEXT NOT NULL,
+        harvested TEXT NOT NULL,
+        path TEXT,
+        normalized INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (source, docID, harvestFinished)
+    );
+    CREATE INDEX IF NOT EXISTS documents_by_date ON documents (source, harvested);
+'''
+
+_catalogs = {}
+
+
+# :: Str -> Catalog
+def get_catalog(path):
+    if path not in _catalogs:
+        _catalogs[path] = Catalog(path)
+    return _catalogs[path]
+
+
+# :: Str|Datetime -> Str
+def utc(date):
+    ''' Catalog dates are compared as strings, so they are all stored in UTC '''
+    if not hasattr(date, 'tzinfo'):
+        date = parser.parse(date)
+    if date.tzinfo is None:
+        date = pytz.utc.localize(date)
+    return date.astimezone(pytz.utc).isoformat()
+
+
+class Catalog(object):
+    ''' A SQLite index of every document in the archive, keyed by source,
+    docID and harvestFinished, recording where its raw document is stored
+    and whether it has been normalized.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.pid = None
+        self._connection = None
+
+    @property
+    def connection(self):
+        # Connections cannot be shared with forked worker processes
+        if self.pid != os.getpid():
+            make_dir(os.path.dirname(os.path.abspath(self.path)))
+            self._connection = sqlite3.connect(self.path, timeout=30)
+            self._connection.executescript(SCHEMA)
+            self.pid = os.getpid()
+        return self._connection
+
+    def _add(self, source, doc_id, harvest_finished):
+        self.connection.execute(
+            'INSERT OR IGNORE INTO documents (source, docID, harvestFinished, harvested) VALUES (?, ?, ?, ?)',
+            (source, doc_id, harvest_finished, utc(harvest_finished))
+        )
+
+    # :: Str -> Str -> Str -> Str -> Nothing
+    def add_raw(self, source, doc_id, harvest_finished, path):
+        with self.connection:
+            self._add(source, doc_id, harvest_finished)
+            self.connection.execute(
+                'UPDATE documents SET path = ? WHERE source = ? AND docID = ? AND harvestFinished = ?',
+                (path, source, doc_id, harvest_finished)
+            )
+
+    # :: Str -> Str -> Str -> Nothing
+    def add_normalized(self, source, doc_id, harvest_finished):
+        with self.connection:
+            self._add(source, doc_id, harvest_finished)
+            self.connection.execute(
+                'UPDATE documents SET normalized = 1 WHERE source = ? AND docID = ? AND harvestFinished = ?',
+                (source, doc_id, harvest_finished)
+            )
+
+    # :: Str -> [(Str, Str, Str, Bool)] -> Nothing
+    def rebuild(self, source, entries):
+        ''' Replaces everything catalogued for source with entries
+        of (docID, harvestFinished, path, normalized)
+        '''
+        with self.connection:
+            self.connection.execute('DELETE FROM documents WHERE source = ?', (source,))
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    (source, doc_id, harvest_finished, utc(harvest_finished), path, int(normalized))
+                    for doc_id, harvest_finished, path, normalized in entries
+                )
+            )
+
+    # :: Str -> Maybe Datetime -> Bool -> [Str]
+    def iter_raws(self, source, since=None, include_normalized=False):
+        query = 'SELECT path FROM documents WHERE source = ? AND path IS NOT NULL'
+        params = [source]
+
+        if since:
+            query += ' AND harvested >= ?'
+            params.append(utc(since))
+        if not include_normalized:
+            query += ' AND NOT normalized'
+
+        for path, in self.connection.execute(query + ' ORDER BY harvested', params):
+            yield path
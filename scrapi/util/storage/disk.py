@@ -1,6 +1,7 @@
 import os
 
 from scrapi import settings
+from scrapi.util import make_dir
 from scrapi.util.storage.base import BaseStorage
 
 
@@ -12,18 +13,20 @@ class DiskStorage(BaseStorage):
         if os.path.exists(filepath) and not overwrite:
             raise Exception('"{}" already exists.'.format(filepath))
 
+        make_dir(os.path.dirname(filepath))
+
         with open(filepath, 'w') as docfile:
             docfile.write(string)
 
-    def get_as_string(self, path):
+    def _read(self, path):
         with open(path)as f:
             return f.read()
 
-    # :: Str -> Bool -> [Str]
-    def iter_raws(self, source, include_normalized=False):
+    # :: Str -> [(Str, Bool)]
+    def _scan(self, source):
         src_dir = os.path.join(settings.ARCHIVE_DIRECTORY, source)
         for dirname, dirnames, filenames in os.walk(src_dir):
-            if 'normalized.json' not in filenames or include_normalized:
-                for filename in filenames:
-                    if 'raw' in filename:
-                        yield os.path.join(dirname, filename)
+            normalized = 'normalized.json' in filenames
+            for filename in filenames:
+                if 'raw' in filename:
+                    yield os.path.join(dirname, filename), normalized
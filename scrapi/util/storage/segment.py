@@ -0,0 +1,169 @@
+import os
+import mmap
+import fcntl
+from collections import defaultdict
+
+from scrapi import settings
+from scrapi.util import make_dir
+from scrapi.util.storage.base import BaseStorage
+
+
+class SegmentStorage(BaseStorage):
+    ''' Stores documents under the same paths as DiskStorage, but packs them
+    into large append-only segment files per source instead of creating a
+    directory per document. Segments are read back through mmap.
+    '''
+    METHOD = 'segment'
+
+    def __init__(self):
+        self.segments = {}
+
+    # :: Str -> Segments
+    def _segments(self, source):
+        directory = os.path.join(settings.ARCHIVE_DIRECTORY, source, 'segments')
+        if directory not in self.segments:
+            self.segments[directory] = Segments(directory)
+        return self.segments[directory]
+
+    # :: Str -> (Segments, Str)
+    def _locate(self, path):
+        parts = os.path.relpath(path, settings.ARCHIVE_DIRECTORY).split(os.sep, 1)
+
+        # Only paths to a file of a document within a source are ever stored
+        if len(parts) != 2 or not parts[1] or os.pardir in parts:
+            raise IOError('"{}" does not exist.'.format(path))
+
+        source, key = parts
+        return self._segments(source), key
+
+    def _store(self, string, path, overwrite=False):
+        segments, key = self._locate(path)
+
+        if isinstance(string, unicode):
+            string = string.encode('utf-8')
+
+        if not segments.append(key, string, overwrite=overwrite):
+            raise Exception('"{}" already exists.'.format(path))
+
+    def _read(self, path):
+        segments, key = self._locate(path)
+        string = segments.read(key)
+
+        if string is None:
+            raise IOError('"{}" does not exist.'.format(path))
+        return string
+
+    # :: Str -> [(Str, Bool)]
+    def _scan(self, source):
+        segments = self._segments(source)
+        segments.refresh()
+
+        filenames = defaultdict(set)
+        for key in segments.entries:
+            dirname, filename = os.path.split(key)
+            filenames[dirname].add(filename)
+
+        # Yield in segment order so reading them back is sequential
+        for key, _ in sorted(segments.entries.items(), key=lambda item: item[1]):
+            dirname, filename = os.path.split(key)
+            if 'raw' in filename:
+                yield os.path.join(settings.ARCHIVE_DIRECTORY, source, key), 'normalized.json' in filenames[dirname]
+
+
+class Segments(object):
+    ''' A directory of numbered segment files and an index of
+    "key\\tsegment\\toffset\\tlength" lines. Writers append under an
+    exclusive lock on the index; the last line for a key wins.
+    '''
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = {}
+        self.segment = 0
+        self.position = 0  # How much of the index has been read
+        self.maps = {}
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, 'index')
+
+    def segment_path(self, segment):
+        return os.path.join(self.directory, '{:08d}.seg'.format(segment))
+
+    # :: Nothing
+    def refresh(self):
+        ''' Reads any index lines written since the last refresh,
+        including those written by other processes. The index is
+        append-only, so it has nothing new unless it has grown
+        '''
+        try:
+            if os.path.getsize(self.index_path) <= self.position:
+                return
+            with open(self.index_path, 'rb') as index:
+                index.seek(self.position)
+                data = index.read()
+        except (IOError, OSError):
+            return
+
+        # A writer may be midway through its line, leave it for next time
+        data = data[:data.rfind('\n') + 1]
+        self.position += len(data)
+
+        for line in data.splitlines():
+            key, segment, offset, length = line.split('\t')
+            self.entries[key] = (int(segment), int(offset), int(length))
+            self.segment = max(self.segment, int(segment))
+
+    # :: Str -> Str -> Bool -> Bool
+    def append(self, key, string, overwrite=False):
+        make_dir(self.directory)
+
+        with open(self.index_path, 'ab') as index:
+            fcntl.flock(index, fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                if key in self.entries and not overwrite:
+                    return False
+
+                with open(self.segment_path(self.segment), 'ab') as segment:
+                    offset = os.fstat(segment.fileno()).st_size
+
+                if offset and offset + len(string) > settings.SEGMENT_SIZE:
+                    self.segment += 1
+                    offset = 0
+
+                with open(self.segment_path(self.segment), 'ab') as segment:
+                    segment.write(string)
+
+                line = '{}\t{}\t{}\t{}\n'.format(key, self.segment, offset, len(string))
+                index.write(line)
+                index.flush()
+
+                self.position += len(line)
+                self.entries[key] = (self.segment, offset, len(string))
+            finally:
+                fcntl.flock(index, fcntl.LOCK_UN)
+
+        return True
+
+    # :: Str -> Maybe Str
+    def read(self, key):
+        # Other processes may have rewritten key since it was last read
+        self.refresh()
+
+        try:
+            segment, offset, length = self.entries[key]
+        except KeyError:
+            return None
+
+        if not length:
+            return ''  # Empty files cannot be mapped
+
+        mapped = self.maps.get(segment)
+
+        # Segments only ever grow, remap if this entry was written after mapping
+        if mapped is None or offset + length > len(mapped):
+            with open(self.segment_path(segment), 'rb') as f:
+                mapped = self.maps[segment] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return mapped[offset:offset + length]
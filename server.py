@@ -1,7 +1,9 @@
 import os
 import json
 import logging
+import mimetypes
 import httplib as http
+from cStringIO import StringIO
 
 import requests
 
@@ -12,7 +14,9 @@ from flask import request
 from flask import send_file
 from flask import send_from_directory
 
+from scrapi import metrics
 from scrapi import settings
+from scrapi.util.storage import store
 
 from website import search
 from website import process_metadata
@@ -60,13 +64,30 @@ def search_search():
 @app.route('/archive/', defaults={'req_path': ''})
 @app.route('/archive/<path:req_path>')
 def archive_exploration(req_path):
-    abs_path = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), 'archive', req_path))
+    # Read through the store, documents may be packed or compressed on disk
     try:
-        return send_file(abs_path)
+        string = store.get_as_string(os.path.join(settings.ARCHIVE_DIRECTORY, req_path))
     except IOError:
         return abort(http.NOT_FOUND)
 
+    return send_file(StringIO(string), mimetypes.guess_type(req_path)[0])
+
+
+@app.route('/metrics', methods=['GET'])
+def show_metrics():
+    """
+    harvester=None
+    """
+    snapshot = metrics.load().snapshot()
+
+    if request.args.get('harvester'):
+        snapshot = {
+            source: stages for source, stages in snapshot.items()
+            if source in (request.args['harvester'], metrics.ALL)
+        }
+
+    return jsonify(snapshot)
+
 
 @app.route('/api/v1/share/', methods=['GET'])
 def show_tutorial():
@@ -110,6 +110,109 @@ def check_archive(harvester=None, reprocess=False, async=False, days=None):
         check_archives.delay(reprocess, days_back=int(days))
 
 
+@task
+def rebuild_catalog(harvester=None):
+    from scrapi.util.storage import store
+
+    for name in ([harvester] if harvester else settings.MANIFESTS.keys()):
+        store.rebuild_catalog(name)
+        logger.info('Rebuilt the archive catalog for {}'.format(name))
+
+
+@task
+def metrics(harvester=None, reset=False):
+    import json
+    import shutil
+    from scrapi import metrics
+
+    snapshot = metrics.load().snapshot()
+    if harvester:
+        snapshot = {harvester: snapshot.get(harvester, {})}
+
+    print json.dumps(snapshot, indent=4, sort_keys=True)
+
+    if reset and settings.METRICS_DIRECTORY:
+        shutil.rmtree(settings.METRICS_DIRECTORY, ignore_errors=True)
+
+
+@task
+def benchmark(harvester=None, days=1, repeat=3, hotspots=20, compare=None):
+    import json
+    from scrapi import benchmark
+
+    names = [harvester] if harvester else sorted(settings.MANIFESTS.keys())
+    results = benchmark.run(names, days_back=int(days), repeat=int(repeat), limit=int(hotspots))
+
+    for name, result in sorted(results['harvesters'].items()):
+        if 'skipped' in result:
+            print '{}: skipped, {}'.format(name, result['skipped'])
+        else:
+            print '{}: {} records, {:.1f} records/sec, {} KB peak memory'.format(
+                name, result['records'], result['recordsPerSecond'] or 0, result['peakMemory']
+            )
+            for spot in result.get('hotspots', [])[:5]:
+                print '    {tottime:.3f}s {calls} calls {function}'.format(**spot)
+
+    print 'Saved results to {}'.format(benchmark.save(results))
+
+    if compare:
+        with open(compare) as f:
+            changes = benchmark.compare(json.load(f), results)
+        for name, change in sorted(changes.items()):
+            print '{}: {before:.1f} -> {after:.1f} records/sec ({change:+.1%})'.format(name, **change)
+
+
+@task
+def benchmark_pipeline(harvester=None, size=1000, workers=2, processors='standin', latency=0.0,
+                       flush_latency=0.0, batch=None, stream=False, claim_check=False, doc_size=2048):
+    from scrapi import benchmark
+    from scrapi import pipeline_benchmark
+
+    settings.RAW_PROCESSING = settings.NORMALIZED_PROCESSING = processors.split(',')
+    settings.STANDIN_LATENCY = float(latency)
+    settings.STANDIN_FLUSH_LATENCY = float(flush_latency)
+    settings.NORMALIZE_BATCH_SIZE = batch and int(batch)
+    settings.STREAM_HARVESTS = stream
+    settings.CLAIM_CHECK_RAW = claim_check
+
+    if harvester:
+        corpus = pipeline_benchmark.recorded_corpus(harvester, int(size))
+    else:
+        corpus = pipeline_benchmark.synthetic_corpus(int(size), doc_size=int(doc_size))
+
+    results = pipeline_benchmark.run(corpus, workers=int(workers))
+
+    print '{documents} documents in {elapsedSeconds:.1f}s, {documentsPerSecond:.1f} documents/sec'.format(**results)
+    print '{totalMessages} messages, {totalBytes} bytes through the broker'.format(**results)
+    print '{:.4f}s overhead per task'.format(results['overheadPerTask'])
+    for name, task_metrics in sorted(results['tasks'].items()):
+        messages = results['messages'].get(name, {'count': 0, 'bytes': 0})
+        print '    {}: {} runs, {:.4f}s mean, {} messages, {} bytes'.format(
+            name, task_metrics['count'], task_metrics['mean'], messages['count'], messages['bytes']
+        )
+
+    print 'Saved results to {}'.format(benchmark.save(results, prefix='pipeline'))
+
+
+@task
+def profiles(task_name=None, harvester=None, limit=30, cumulative=False, reset=False):
+    import shutil
+    from scrapi import benchmark
+    from scrapi import profiling
+
+    stats = profiling.merge(task=task_name, harvester=harvester)
+    if not stats:
+        print 'No profiles saved in {}'.format(profiling.profile_directory())
+        return
+
+    print '{} calls, {:.3f}s of profiled task time'.format(stats.total_calls, stats.total_tt)
+    for spot in benchmark.hotspots(stats, int(limit), cumulative=cumulative):
+        print '{tottime:10.3f}s {cumtime:10.3f}s {calls:10} {function}'.format(**spot)
+
+    if reset:
+        shutil.rmtree(profiling.profile_directory(), ignore_errors=True)
+
+
 @task
 def lint_all():
     for name in settings.MANIFESTS.keys():
@@ -118,6 +221,8 @@ def lint_all():
 
 @task
 def lint(name):
+    # Harvesting and normalizing both happen in this process
+    settings.CELERY_ALWAYS_EAGER = True
     manifest = settings.MANIFESTS[name]
     harvester = import_harvester(name)
     try:
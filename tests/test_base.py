@@ -0,0 +1,220 @@
+from __future__ import unicode_literals
+
+import mock
+import pickle
+import httpretty
+
+from lxml import etree
+
+from scrapi import settings
+from scrapi.base import OAIHarvester, OAIRecord
+from scrapi.linter.document import RawDocument
+
+
+RECORD = '''
+<record>
+    <header>
+        <identifier>{0}</identifier>
+        <datestamp>2015-03-01</datestamp>
+    </header>
+    <metadata>
+        <oai_dc:dc xmlns:oai_dc="http://www.openarchives.org/OAI/2.0/oai_dc/"
+                   xmlns:dc="http://purl.org/dc/elements/1.1/">
+            <dc:title>Title {0}</dc:title>
+            <dc:identifier>http://example.com/{0}</dc:identifier>
+        </oai_dc:dc>
+    </metadata>
+</record>
+'''
+
+PAGE = '''<?xml version="1.0" encoding="UTF-8"?>
+<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">
+    <ListRecords>
+        {records}
+        {token}
+    </ListRecords>
+</OAI-PMH>
+'''
+
+TOKEN = '<resumptionToken>{}</resumptionToken>'
+
+
+def page(ids, token=None):
+    return PAGE.format(
+        records=''.join(RECORD.format(doc_id) for doc_id in ids),
+        token=TOKEN.format(token) if token else ''
+    )
+
+
+def pages_callback(request, uri, headers):
+    token = request.querystring.get('resumptionToken', [None])[0]
+    if token is None:
+        return 200, headers, page(['a', 'b'], token='second')
+    if token == 'second':
+        return 200, headers, page(['c'], token='third')
+    return 200, headers, page(['d'])
+
+
+@httpretty.activate
+def test_iter_records_follows_resumption_tokens():
+    httpretty.register_uri(httpretty.GET, 'http://oai.test/oai', body=pages_callback)
+    harvester = OAIHarvester('test', 'http://oai.test/oai', timeout=0)
+
+    url = 'http://oai.test/oai?verb=ListRecords&metadataPrefix=oai_dc&from=2015-03-01'
+    records = list(harvester.iter_records(url, '2015-03-01'))
+
+    assert len(records) == 4
+    assert httpretty.last_request().querystring['resumptionToken'] == ['third']
+
+
+@httpretty.activate
+def test_iter_harvest_yields_raw_documents():
+    httpretty.register_uri(httpretty.GET, 'http://oai.test/oai', body=pages_callback)
+    harvester = OAIHarvester('test', 'http://oai.test/oai', timeout=0)
+
+    raws = harvester.iter_harvest()
+
+    assert not isinstance(raws, list)
+
+    raws = list(raws)
+    assert [raw['docID'] for raw in raws] == ['a', 'b', 'c', 'd']
+    assert all(isinstance(raw, RawDocument) for raw in raws)
+
+
+@httpretty.activate
+def test_harvest_returns_list():
+    httpretty.register_uri(httpretty.GET, 'http://oai.test/oai', body=pages_callback)
+    harvester = OAIHarvester('test', 'http://oai.test/oai', timeout=0)
+
+    raws = harvester.harvest()
+
+    assert isinstance(raws, list)
+    assert len(raws) == 4
+
+
+FULL_RECORD = '''
+<record xmlns="http://www.openarchives.org/OAI/2.0/">
+    <header status="{status}">
+        <identifier>oai:test:1</identifier>
+        <datestamp>2015-03-01</datestamp>
+        <setSpec>publication:one</setSpec>
+    </header>
+    <metadata>
+        <oai_dc:dc xmlns:oai_dc="http://www.openarchives.org/OAI/2.0/oai_dc/"
+                   xmlns:dc="http://purl.org/dc/elements/1.1/">
+            <dc:title>A Title</dc:title>
+            <dc:description>A description</dc:description>
+            <dc:creator>Jane Q. Doe</dc:creator>
+            <dc:contributor>John Smith</dc:contributor>
+            <dc:subject>One, Two</dc:subject>
+            <dc:subject>Three</dc:subject>
+            <dc:identifier>doi:10.1234/test</dc:identifier>
+            <dc:identifier>http://example.com/1</dc:identifier>
+            <dc:type>text</dc:type>
+            <dc:type>article</dc:type>
+            <dc:date>2015-02-28</dc:date>
+        </oai_dc:dc>
+    </metadata>
+</record>
+'''
+
+
+def full_raw(status=''):
+    return RawDocument({
+        'doc': FULL_RECORD.format(status=status).encode('utf-8'),
+        'source': 'test',
+        'docID': 'oai:test:1',
+        'filetype': 'xml'
+    })
+
+
+def test_normalize():
+    harvester = OAIHarvester('test', 'http://oai.test/oai', property_list=['type', 'date', 'setSpec'])
+
+    normalized = harvester.normalize(full_raw())
+
+    assert normalized['title'] == 'A Title'
+    assert normalized['description'] == 'A description'
+    assert normalized['dateUpdated'] == '2015-03-01T00:00:00'
+    assert normalized['id'] == {'serviceID': 'oai:test:1', 'doi': '10.1234/test', 'url': 'http://example.com/1'}
+    assert [c['family'] for c in normalized['contributors']] == ['Smith', 'Doe']
+    assert sorted(normalized['tags']) == ['one', 'three', 'two']
+    assert normalized['properties'] == {
+        'type': ['text', 'article'],
+        'date': ['2015-02-28'],
+        'setSpec': ['publication:one']
+    }
+
+
+def test_normalize_filters_sets_and_deleted():
+    assert OAIHarvester('test', 'http://oai.test/oai', approved_sets=['two']).normalize(full_raw()) is None
+    assert OAIHarvester('test', 'http://oai.test/oai', approved_sets=['one']).normalize(full_raw()) is not None
+    assert OAIHarvester('test', 'http://oai.test/oai').normalize(full_raw(status='deleted')) is None
+
+
+
+def test_oai_record_matches_xpath():
+    root = etree.XML(FULL_RECORD.format(status='').encode('utf-8'))
+    record = OAIRecord(root, OAIHarvester.NAMESPACES)
+
+    for prefix, name in [('dc', 'subject'), ('dc', 'type'), ('dc', 'missing'), ('ns0', 'setSpec')]:
+        expression = './/{}:{}/node()'.format(prefix, name)
+        assert record.get(prefix, name) == root.xpath(expression, namespaces=OAIHarvester.NAMESPACES)
+
+
+def test_oai_record_keeps_no_elements():
+    doc = FULL_RECORD.format(status='').replace('A description', 'A <i>short</i> description')
+    record = OAIRecord(etree.XML(doc), OAIHarvester.NAMESPACES, doc=doc)
+
+    assert '{http://www.openarchives.org/OAI/2.0/}metadata' not in record.nodes
+    assert record._root is None
+
+    text, italic, tail = record.get('dc', 'description')
+    nodes = [node for values in record.nodes.values() for node in values]
+    # Elements and lxml's smart strings both reach back into the tree they came from
+    assert not any(hasattr(node, 'getroottree') or hasattr(node, 'getparent') for node in nodes)
+    assert (text, tail) == ('A ', ' description')
+    assert etree.XML(italic).text == 'short'
+
+
+@httpretty.activate
+@mock.patch.object(settings, 'CELERY_ALWAYS_EAGER', True)
+def test_eager_harvest_carries_parsed_records():
+    httpretty.register_uri(httpretty.GET, 'http://oai.test/oai', body=pages_callback)
+    harvester = OAIHarvester('test', 'http://oai.test/oai', timeout=0)
+
+    raws = harvester.harvest()
+    assert all(isinstance(raw.parsed, OAIRecord) for raw in raws)
+
+    with mock.patch('scrapi.base.etree.XML', side_effect=AssertionError):
+        assert [harvester.get_title(raw.parsed) for raw in raws] == ['Title a', 'Title b', 'Title c', 'Title d']
+
+
+@httpretty.activate
+@mock.patch.object(settings, 'CELERY_ALWAYS_EAGER', False)
+def test_harvest_only_parses_for_eager_runs():
+    httpretty.register_uri(httpretty.GET, 'http://oai.test/oai', body=pages_callback)
+    harvester = OAIHarvester('test', 'http://oai.test/oai', timeout=0)
+
+    assert all(raw.parsed is None for raw in harvester.harvest())
+
+
+@httpretty.activate
+@mock.patch.object(settings, 'CELERY_ALWAYS_EAGER', True)
+def test_parsed_records_are_not_pickled():
+    httpretty.register_uri(httpretty.GET, 'http://oai.test/oai', body=pages_callback)
+    harvester = OAIHarvester('test', 'http://oai.test/oai', timeout=0)
+
+    raw = harvester.harvest()[0]
+    unpickled = pickle.loads(pickle.dumps(raw))
+
+    assert unpickled.parsed is None
+    assert unpickled.attributes == raw.attributes
+    assert harvester.normalize(unpickled).attributes == harvester.normalize(raw).attributes
+
+
+def test_parsed_record_reparses_for_xpath():
+    record = OAIRecord(etree.XML(FULL_RECORD.format(status='')), OAIHarvester.NAMESPACES, doc=FULL_RECORD.format(status=''))
+
+    assert record._root is None
+    assert record.xpath('//dc:title/node()', namespaces=OAIHarvester.NAMESPACES) == ['A Title']
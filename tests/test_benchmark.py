@@ -0,0 +1,114 @@
+from datetime import date
+
+import mock
+import pytest
+
+from scrapi import requests
+from scrapi import benchmark
+from scrapi.linter.document import RawDocument
+
+
+CASSETTE = '''interactions:
+- request:
+    body: ''
+    headers: {}
+    method: GET
+    uri: http://benchmark.example.com/oai?from=2015-01-01&verb=ListRecords
+  response:
+    body: {string: 'one two three'}
+    headers: {}
+    status: {code: 200, message: OK}
+version: 1
+'''
+
+
+class FakeHarvester(object):
+
+    def harvest(self, days_back=1):
+        url = 'http://benchmark.example.com/oai?from={}&verb=ListRecords'.format(date.today().isoformat())
+        return [
+            RawDocument({'doc': word, 'docID': word.decode('utf-8'), 'source': u'fake', 'filetype': u'xml'})
+            for word in requests.get(url).content.split()
+        ]
+
+    def normalize(self, raw_doc):
+        return None if raw_doc['doc'] == 'two' else {'title': raw_doc['doc']}
+
+
+@pytest.fixture
+def records(monkeypatch, tmpdir):
+    monkeypatch.setattr(benchmark.settings, 'RECORD_DIRECTORY', str(tmpdir.join('records')))
+    monkeypatch.setattr(benchmark.settings, 'BENCHMARK_DIRECTORY', str(tmpdir.join('benchmarks')))
+    tmpdir.join('records', 'fake', '2015-01-01T00:00:00+00:00.yml').write(CASSETTE, ensure=True)
+    return tmpdir
+
+
+def test_undated_uri():
+    first = mock.Mock(uri='http://example.com/?from=2015-01-01T00:00:00Z&until=2015-01-02')
+    second = mock.Mock(uri='http://example.com/?from=2016-10-17T12:30:00Z&until=2016-10-18')
+    other = mock.Mock(uri='http://example.com/?from=2016-10-17&set=other')
+
+    assert benchmark.undated_uri(first, second)
+    assert not benchmark.undated_uri(first, other)
+
+
+def test_latest_cassette(records):
+    records.join('records', 'fake', '2014-01-01T00:00:00+00:00.yml').write('')
+
+    assert benchmark.latest_cassette('fake').endswith('2015-01-01T00:00:00+00:00.yml')
+    assert benchmark.latest_cassette('missing') is None
+
+
+def test_run_replays_and_saves(records, monkeypatch):
+    monkeypatch.setattr(benchmark.util, 'import_harvester', lambda name: FakeHarvester())
+
+    results = benchmark.run(['fake', 'missing'], repeat=2, limit=5)
+
+    fake = results['harvesters']['fake']
+    assert fake['records'] == 3
+    assert fake['normalized'] == 2
+    assert len(fake['normalizeSeconds']) == 2
+    assert fake['peakMemory'] > 0
+    assert len(fake['hotspots']) <= 5
+    assert any('normalize' in spot['function'] for spot in fake['hotspots'])
+    assert 'skipped' in results['harvesters']['missing']
+
+    path = benchmark.save(results)
+    saved, = records.join('benchmarks').listdir()
+    assert str(saved) == path
+
+
+def test_benchmark_harvests_like_a_worker(records, monkeypatch):
+    harvester = FakeHarvester()
+    harvester.harvest = mock.Mock(side_effect=lambda days_back: [benchmark.settings.CELERY_ALWAYS_EAGER])
+    monkeypatch.setattr(benchmark.settings, 'CELERY_ALWAYS_EAGER', True)
+
+    benchmark.benchmark_harvester(harvester, benchmark.latest_cassette('fake'), repeat=0, limit=0)
+
+    harvester.harvest.assert_called_once_with(days_back=1)
+    assert benchmark.settings.CELERY_ALWAYS_EAGER is True
+
+
+def test_run_measures_each_harvester_alone(records, monkeypatch):
+    records.join('records', 'other', '2015-01-01T00:00:00+00:00.yml').write(CASSETTE, ensure=True)
+    monkeypatch.setattr(benchmark.util, 'import_harvester', lambda name: FakeHarvester())
+    ballast = []
+
+    def benchmark_harvester(harvester, cassette, **kwargs):
+        ballast.append(' ' * 50 * 1024 * 1024)
+        return {'peakMemory': benchmark.peak_memory()}
+
+    monkeypatch.setattr(benchmark, 'benchmark_harvester', benchmark_harvester)
+
+    results = benchmark.run(['fake', 'other'])
+
+    # Without a process each, the second harvester would be charged for the first one's memory
+    assert abs(results['harvesters']['fake']['peakMemory'] - results['harvesters']['other']['peakMemory']) < 25 * 1024
+    assert ballast == []
+
+
+def test_compare():
+    old = {'harvesters': {'fast': {'recordsPerSecond': 100.0}, 'gone': {'recordsPerSecond': 1.0}}}
+    new = {'harvesters': {'fast': {'recordsPerSecond': 50.0}, 'new': {'recordsPerSecond': 1.0}}}
+
+    assert benchmark.compare(old, new) == {'fast': {'before': 100.0, 'after': 50.0, 'change': -0.5}}
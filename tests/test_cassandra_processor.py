@@ -1,3 +1,5 @@
+import mock
+import pytest
 import utils
 
 from scrapi import settings
@@ -6,6 +8,7 @@ from scrapi.linter.document import NormalizedDocument, RawDocument
 # Need to force cassandra to ignore set keyspace
 settings.CASSANDRA_KEYSPACE = 'test'
 from scrapi.processing.cassandra import CassandraProcessor, DocumentModel, VersionModel
+from scrapi.processing.cassandra import AsyncWriter, VERSIONED_FIELDS, unchanged
 
 
 test_db = CassandraProcessor()
@@ -57,3 +60,139 @@ def wipe_database():
         model.delete()
 
     assert (len(DocumentModel.objects) + len(VersionModel.objects)) == 0
+
+
+class FakeFuture(object):
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+
+    def add_callbacks(self, callback, errback, callback_args=(), errback_args=()):
+        if self.error:
+            errback(self.error, *errback_args)
+        else:
+            callback(self.result, *callback_args)
+
+
+def fake_session(rows):
+    session = mock.MagicMock()
+    session.prepare.side_effect = lambda query: query
+    session.execute_async.side_effect = lambda query, params: FakeFuture(rows if query.startswith('SELECT') else None)
+    return session
+
+
+def test_async_writer_new_document():
+    session = fake_session([])
+    writer = AsyncWriter(session, 2)
+
+    writer.write('someID', 'tests', title='A title')
+
+    assert writer.wait() == []
+    assert session.execute_async.call_count == 2
+
+    update, values = session.execute_async.call_args[0]
+    assert update.startswith('UPDATE')
+    assert values == ['A title', [], 'someID', 'tests']
+
+
+def test_async_writer_versions_existing_document():
+    session = fake_session([{'docID': 'someID', 'source': 'tests', 'url': 'http://example.com', 'title': 'Old title'}])
+    writer = AsyncWriter(session, 2)
+
+    writer.write('someID', 'tests', title='A title')
+
+    assert writer.wait() == []
+    assert session.execute_async.call_count == 3
+
+    (_, version), (update, values) = [call[0] for call in session.execute_async.call_args_list[1:]]
+    key = version[0]
+
+    assert version[1 + VERSIONED_FIELDS.index('title')] == 'Old title'
+    assert update.startswith('UPDATE')
+    assert values == ['A title', [key], 'someID', 'tests']
+
+
+def test_async_writer_records_errors():
+    session = fake_session([])
+    session.execute_async.side_effect = lambda query, params: FakeFuture(error=ValueError('Nope'))
+    writer = AsyncWriter(session, 1)
+
+    writer.write('someID', 'tests', title='A title')
+    writer.write('otherID', 'tests', title='A title')
+
+    errors = writer.wait()
+    assert [error[0] for error in errors] == ['someID', 'otherID']
+    assert writer.wait() == []
+
+
+def test_unchanged():
+    row = {'rawDigest': 'abc', 'normalizedDigest': None}
+
+    assert unchanged(row, {'rawDigest': 'abc', 'title': 'A title'})
+    assert not unchanged(row, {'rawDigest': 'def'})
+    assert not unchanged(row, {'normalizedDigest': 'abc'})
+    assert not unchanged(row, {'title': 'A title'})
+
+
+def test_async_writer_skips_unchanged():
+    session = fake_session([{'docID': 'someID', 'source': 'tests', 'url': 'http://example.com', 'rawDigest': 'abc'}])
+    writer = AsyncWriter(session, 1)
+
+    writer.write('someID', 'tests', rawDigest='abc', doc='{}')
+
+    assert writer.wait() == []
+    assert session.execute_async.call_count == 1
+
+
+def async_processor(session):
+    processor = CassandraProcessor.__new__(CassandraProcessor)
+    processor.writer = AsyncWriter(session, 2)
+    processor.deferred = {}
+    return processor
+
+
+def test_async_write_waits_and_raises():
+    session = fake_session([])
+    session.execute_async.side_effect = lambda query, params: FakeFuture(error=ValueError('Nope'))
+    processor = async_processor(session)
+
+    with pytest.raises(ValueError):
+        processor.write('someID', 'tests', title='A title')
+
+    assert processor.writer.in_flight == 0
+
+
+def test_async_write_deferred_to_flush():
+    session = fake_session([])
+    session.execute_async.side_effect = lambda query, params: FakeFuture(error=ValueError('Nope'))
+    processor = async_processor(session)
+
+    processor.write('someID', 'tests', wait=False, title='A title')
+    processor.write('otherID', 'tests', wait=False, title='A title')
+
+    with pytest.raises(ValueError):
+        processor.flush()
+    processor.flush()
+
+
+def test_deferred_failures_are_dispatched(monkeypatch):
+    mock_dispatch = mock.Mock()
+    monkeypatch.setattr('scrapi.processing.cassandra.events.dispatch', mock_dispatch)
+    monkeypatch.setattr(settings, 'USE_FLUENTD', True)
+
+    error = ValueError('Nope')
+    session = fake_session([])
+    session.execute_async.side_effect = lambda query, params: FakeFuture(
+        error=error if params[0] == 'otherID' else None, result=[] if query.startswith('SELECT') else None
+    )
+    processor = async_processor(session)
+
+    processor.write('someID', 'tests', wait=False, index='raw.cassandra', title='A title')
+    processor.write('otherID', 'tests', wait=False, index='raw.cassandra', title='A title')
+
+    with pytest.raises(ValueError):
+        processor.flush()
+
+    mock_dispatch.assert_called_once_with('processing', 'failed', _index='raw.cassandra',
+                                          harvester='tests', docID='otherID', exception=error)
+    assert processor.deferred == {}
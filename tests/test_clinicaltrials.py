@@ -0,0 +1,74 @@
+import mock
+import pytest
+import requests
+
+from scrapi.harvesters.clinicaltrials import harvester
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    sleep = mock.Mock()
+    monkeypatch.setattr('scrapi.harvesters.clinicaltrials.harvester.time.sleep', sleep)
+    return sleep
+
+
+def response(status_code, content='', url='http://example.com'):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp._content = content
+    resp.url = url
+    return resp
+
+
+@pytest.mark.parametrize('result', [requests.exceptions.ConnectionError(), response(503)])
+def test_fetch_skips_failed_studies(monkeypatch, result):
+    monkeypatch.setattr('scrapi.requests.get', mock.Mock(side_effect=[result]))
+
+    assert harvester.fetch(mock.Mock(), 'http://example.com') is None
+
+
+def test_fetch_waits_for_limiter(monkeypatch):
+    limiter = mock.Mock()
+    monkeypatch.setattr('scrapi.requests.get', mock.Mock(return_value=response(200)))
+
+    assert harvester.fetch(limiter, 'http://example.com').status_code == 200
+    limiter.wait.assert_called_once_with()
+
+
+def test_rate_limiter_spaces_calls(no_sleep, monkeypatch):
+    monkeypatch.setattr('scrapi.harvesters.clinicaltrials.harvester.time.time', lambda: 100.0)
+    limiter = harvester.RateLimiter(4)
+
+    for _ in range(3):
+        limiter.wait()
+
+    assert no_sleep.call_args_list == [mock.call(0.25), mock.call(0.5)]
+
+
+@pytest.mark.parametrize('content', ['<clinical_study>', '<clinical_study></clinical_study>'])
+def test_parse_study_skips_bad_studies(content):
+    assert harvester.parse_study(response(200, content), 'UTF-8') is None
+
+
+def test_parse_study():
+    study = harvester.parse_study(response(200, '<clinical_study><nct_id>NCT1</nct_id></clinical_study>'), 'UTF-8')
+
+    assert study['docID'] == u'NCT1'
+    assert study['source'] == harvester.NAME
+
+
+def test_failed_harvest_stops_the_pool(monkeypatch):
+    search = '<search_results count="2"><clinical_study><url>http://example.com/1</url></clinical_study>' \
+             '<clinical_study><url>http://example.com/2</url></clinical_study></search_results>'
+    pool = mock.MagicMock()
+    pool.imap.return_value = iter([response(200, '<clinical_study><nct_id>NCT1</nct_id></clinical_study>')] * 2)
+    monkeypatch.setattr(harvester, 'ThreadPool', lambda workers: pool)
+    monkeypatch.setattr(harvester, 'RawDocument', mock.Mock(side_effect=[mock.Mock(), KeyboardInterrupt]))
+    monkeypatch.setattr('scrapi.requests.get', lambda url: response(200, search))
+
+    with pytest.raises(KeyboardInterrupt):
+        harvester.harvest()
+
+    pool.terminate.assert_called_once_with()
+    pool.join.assert_called_once_with()
+    assert not pool.close.called
@@ -1,7 +1,11 @@
+import mock
+import pytest
 import utils
 
+from scrapi import settings
+from scrapi.util import content_digest
 from scrapi.linter.document import NormalizedDocument, RawDocument
-from scrapi.processing.elastic_search import es, ElasticsearchProcessor
+from scrapi.processing.elastic_search import es, BulkIndexError, ElasticsearchProcessor
 
 test_db = ElasticsearchProcessor()
 
@@ -34,3 +38,151 @@ def test_versions():
     results = es.search(index='share', doc_type='test')
     assert (len(results['hits']['hits']) == 1)
     assert (results['hits']['hits'][0]['_source']['title'] == 'a new title')
+
+
+def normalized_doc(doc_id, title=u'A title'):
+    record = dict(utils.RECORD, id=dict(utils.RECORD['id'], serviceID=doc_id), title=title, source=u'test')
+    return NormalizedDocument(record)
+
+
+def test_bulk_buffers_until_size(monkeypatch):
+    mock_es = mock.MagicMock()
+    mock_bulk = mock.MagicMock(return_value=(1, []))
+    mock_es.mget.return_value = {'docs': [{'found': False}] * 2}
+
+    monkeypatch.setattr('scrapi.processing.elastic_search.es', mock_es)
+    monkeypatch.setattr('scrapi.processing.elastic_search.helpers.bulk', mock_bulk)
+    monkeypatch.setattr(settings, 'ELASTIC_BULK', True)
+    monkeypatch.setattr(settings, 'ELASTIC_BULK_SIZE', 2)
+
+    processor = ElasticsearchProcessor()
+
+    processor.process_normalized(RAW, normalized_doc(u'one'))
+    assert not mock_bulk.called
+    assert not mock_es.index.called
+
+    processor.process_normalized(RAW, normalized_doc(u'two'))
+    assert mock_es.mget.call_count == 1
+    assert mock_bulk.call_count == 1
+
+    actions = mock_bulk.call_args[0][1]
+    assert sorted(action['_id'] for action in actions) == ['one', 'two']
+    assert processor.buffer == []
+
+
+def test_bulk_keeps_old_dateUpdated(monkeypatch):
+    mock_es = mock.MagicMock()
+    mock_bulk = mock.MagicMock(return_value=(1, []))
+    mock_es.mget.return_value = {'docs': [{'found': True, '_source': {'dateUpdated': 'old date'}}]}
+
+    monkeypatch.setattr('scrapi.processing.elastic_search.es', mock_es)
+    monkeypatch.setattr('scrapi.processing.elastic_search.helpers.bulk', mock_bulk)
+    monkeypatch.setattr(settings, 'ELASTIC_BULK', True)
+
+    processor = ElasticsearchProcessor()
+    processor.process_normalized(RAW, normalized_doc(u'one'))
+    processor.process_normalized(RAW, normalized_doc(u'one', title=u'A new title'))
+    processor.flush()
+
+    actions = mock_bulk.call_args[0][1]
+    assert len(mock_es.mget.call_args[1]['body']['docs']) == 1
+    assert [action['_source']['dateUpdated'] for action in actions] == ['old date', 'old date']
+    assert actions[-1]['_source']['title'] == 'A new title'
+
+
+def test_flush_empty_buffer(monkeypatch):
+    mock_es = mock.MagicMock()
+    monkeypatch.setattr('scrapi.processing.elastic_search.es', mock_es)
+
+    ElasticsearchProcessor().flush()
+
+    assert not mock_es.mget.called
+
+
+def test_skips_unchanged(monkeypatch):
+    normalized = normalized_doc(u'one')
+    mock_es = mock.MagicMock()
+    mock_es.get_source.return_value = {'dateUpdated': 'old date', 'contentDigest': content_digest(normalized)}
+
+    monkeypatch.setattr('scrapi.processing.elastic_search.es', mock_es)
+
+    ElasticsearchProcessor().process_normalized(RAW, normalized)
+    assert not mock_es.index.called
+
+    normalized['title'] = u'A new title'
+    ElasticsearchProcessor().process_normalized(RAW, normalized)
+
+    body = mock_es.index.call_args[1]['body']
+    assert body['dateUpdated'] == 'old date'
+    assert body['contentDigest'] == content_digest(normalized)
+    assert normalized['dateUpdated'] == utils.RECORD['dateUpdated']
+
+
+def test_bulk_skips_unchanged(monkeypatch):
+    unchanged, changed = normalized_doc(u'one'), normalized_doc(u'two')
+    mock_es = mock.MagicMock()
+    mock_bulk = mock.MagicMock(return_value=(1, []))
+    mock_es.mget.side_effect = lambda body: {'docs': [
+        {'found': True, '_source': {'dateUpdated': 'old date', 'contentDigest': content_digest(unchanged)}}
+        if doc['_id'] == u'one' else {'found': False}
+        for doc in body['docs']
+    ]}
+
+    monkeypatch.setattr('scrapi.processing.elastic_search.es', mock_es)
+    monkeypatch.setattr('scrapi.processing.elastic_search.helpers.bulk', mock_bulk)
+    monkeypatch.setattr(settings, 'ELASTIC_BULK', True)
+
+    processor = ElasticsearchProcessor()
+    processor.process_normalized(RAW, unchanged)
+    processor.process_normalized(RAW, changed)
+    processor.flush()
+
+    actions = mock_bulk.call_args[0][1]
+    assert [action['_id'] for action in actions] == [u'two']
+
+
+def test_bulk_flushes_after_interval(monkeypatch):
+    mock_es = mock.MagicMock()
+    mock_bulk = mock.MagicMock(return_value=(1, []))
+    mock_es.mget.return_value = {'docs': [{'found': False}]}
+
+    monkeypatch.setattr('scrapi.processing.elastic_search.es', mock_es)
+    monkeypatch.setattr('scrapi.processing.elastic_search.helpers.bulk', mock_bulk)
+    monkeypatch.setattr(settings, 'ELASTIC_BULK', True)
+    monkeypatch.setattr(settings, 'ELASTIC_BULK_INTERVAL', 0.01)
+
+    processor = ElasticsearchProcessor()
+    processor.process_normalized(RAW, normalized_doc(u'one'))
+
+    timer = processor.timer
+    timer.join(5)
+
+    assert mock_bulk.call_count == 1
+    assert processor.buffer == []
+    assert processor.timer is None
+
+
+def test_bulk_errors_are_reported(monkeypatch):
+    mock_es = mock.MagicMock()
+    mock_dispatch = mock.Mock()
+    mock_es.mget.return_value = {'docs': [{'found': False}] * 2}
+    error = {'index': {'_type': 'test', '_id': 'two', 'status': 400, 'error': 'MapperParsingException'}}
+
+    monkeypatch.setattr('scrapi.processing.elastic_search.es', mock_es)
+    monkeypatch.setattr('scrapi.processing.elastic_search.helpers.bulk', mock.Mock(return_value=(1, [error])))
+    monkeypatch.setattr('scrapi.processing.elastic_search.events.dispatch', mock_dispatch)
+    monkeypatch.setattr(settings, 'ELASTIC_BULK', True)
+    monkeypatch.setattr(settings, 'USE_FLUENTD', True)
+
+    processor = ElasticsearchProcessor()
+    processor.process_normalized(RAW, normalized_doc(u'one'))
+    processor.process_normalized(RAW, normalized_doc(u'two'))
+
+    with pytest.raises(BulkIndexError):
+        processor.flush()
+
+    assert processor.buffer == []
+    mock_dispatch.assert_called_once_with(
+        'processing', 'failed', _index='normalized.elasticsearch',
+        harvester='test', docID='two', exception='MapperParsingException'
+    )
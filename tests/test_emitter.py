@@ -0,0 +1,132 @@
+import socket
+
+import mock
+import pytest
+from fluent.sender import FluentSender
+
+from scrapi import events
+from scrapi import emitter
+
+
+class FakeSender(object):
+    socket = object()
+    pendings = None
+
+    def __init__(self):
+        self.events = []
+
+    def emit_with_time(self, label, timestamp, data):
+        self.events.append(('app.' + label, timestamp, data))
+
+
+@pytest.fixture
+def sender():
+    return FakeSender()
+
+
+def test_sends_batches(sender):
+    buffered = emitter.BufferedEmitter(sender, batch_size=2, interval=5)
+
+    for i in range(5):
+        assert buffered.emit('test', i, {'i': i})
+
+    assert buffered.flush(timeout=5)
+    assert sender.events == [('app.test', i, {'i': i}) for i in range(5)]
+    assert buffered.stats() == {'queued': 0, 'pending': 0, 'emitted': 5, 'sent': 5, 'dropped': 0, 'failed': 0}
+
+
+@pytest.mark.parametrize(('overflow', 'kept'), [
+    (emitter.DROP_NEWEST, [0, 1]),
+    (emitter.DROP_OLDEST, [2, 3]),
+    (emitter.BLOCK, [0, 1]),
+])
+def test_overflow(sender, overflow, kept):
+    buffered = emitter.BufferedEmitter(sender, maxsize=2, batch_size=10, overflow=overflow, block_timeout=0.01)
+    buffered._ensure_thread = mock.Mock()  # Nothing drains the queue
+
+    results = [buffered.emit('test', i, {}) for i in range(4)]
+
+    assert [timestamp for _, timestamp, _ in buffered.queue] == kept
+    assert buffered.dropped == 2
+    assert results == ([True] * 4 if overflow == emitter.DROP_OLDEST else [True, True, False, False])
+
+
+def test_close_flushes_and_drops_later_events(sender):
+    buffered = emitter.BufferedEmitter(sender, batch_size=100, interval=60)
+    buffered.emit('test', 1, {})
+
+    buffered.close(timeout=5)
+
+    assert sender.events == [('app.test', 1, {})]
+    assert not buffered.emit('test', 2, {})
+    assert buffered.stats()['dropped'] == 1
+
+
+def test_flush_without_thread(sender):
+    buffered = emitter.BufferedEmitter(sender)
+    buffered._ensure_thread = mock.Mock()
+    buffered.emit('test', 1, {})
+
+    assert buffered.flush()
+    assert sender.events == [('app.test', 1, {})]
+
+
+def closed_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_lost_events_are_counted():
+    # With no room to buffer, the sender holds one event and throws it away along with the next
+    unreachable = FluentSender('app', host='127.0.0.1', port=closed_port(), bufmax=0, timeout=1)
+    buffered = emitter.BufferedEmitter(unreachable)
+
+    buffered.send([('test', 1, {})] * 3)
+    assert buffered.stats()['failed'] == 2
+    assert buffered.stats()['pending'] == 1
+
+    buffered.close(timeout=1)
+    assert buffered.stats()['failed'] == 3
+    assert buffered.stats()['pending'] == 0
+
+
+def test_pending_events_are_sent_with_the_next(sender):
+    buffered = emitter.BufferedEmitter(sender)
+    sender.socket, sender.pendings = None, 'unsent'
+    buffered.send([('test', 1, {})])
+
+    sender.socket, sender.pendings = object(), None
+    buffered.send([('test', 2, {})])
+
+    assert buffered.stats()['sent'] == 2
+    assert buffered.stats()['pending'] == 0
+
+
+def test_worker_shutdown_closes_the_emitter(monkeypatch):
+    buffered = mock.Mock()
+    monkeypatch.setattr(emitter, '_emitter', buffered)
+
+    emitter.shutdown()
+
+    buffered.close.assert_called_once_with()
+
+
+def test_unknown_overflow(sender):
+    with pytest.raises(ValueError):
+        emitter.BufferedEmitter(sender, overflow='explode')
+
+
+def test_dispatch_uses_emitter(monkeypatch):
+    buffered = mock.Mock()
+    monkeypatch.setattr(events.settings, 'USE_FLUENTD', True)
+    monkeypatch.setattr(events, 'get_emitter', lambda: buffered)
+    monkeypatch.setattr(events.event, 'Event', mock.Mock(side_effect=AssertionError))
+
+    events.dispatch('event', 'passed', _index='foo', ash='ketchem')
+
+    label, _, data = buffered.emit.call_args[0]
+    assert label == 'event.foo'
+    assert data == {'event': 'event', 'status': 'passed', 'ash': 'ketchem'}
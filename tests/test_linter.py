@@ -0,0 +1,120 @@
+import copy
+import pickle
+
+import mock
+import utils
+import pytest
+
+from scrapi.linter import document
+from scrapi.linter.util import lint, compile_schema
+from scrapi.linter.document import RawDocument, NormalizedDocument
+
+
+def error(func, *args):
+    try:
+        func(*args)
+    except Exception as e:
+        return type(e), str(e)
+    return None
+
+
+def normalized(**changes):
+    record = copy.deepcopy(dict(utils.RECORD, source=u'test'))
+    for path, value in changes.items():
+        target = record
+        keys = path.split('__')
+        for key in keys[:-1]:
+            target = target[key]
+        if value is KeyError:
+            del target[keys[-1]]
+        else:
+            target[keys[-1]] = value
+    return record
+
+
+@pytest.mark.parametrize('document', [
+    normalized(),
+    normalized(title='str'),
+    normalized(title=KeyError),
+    normalized(id__url=u''),
+    normalized(id__url='str'),
+    normalized(id__doi=None),
+    normalized(contributors=[{}]),
+    normalized(contributors={}),
+    normalized(tags=[u'a', 'b']),
+    [],
+])
+def test_compiled_matches_lint(document):
+    schema = NormalizedDocument.REQUIRED_FIELDS
+    assert error(compile_schema(schema), document) == error(lint, document, schema)
+
+
+def test_nested_error_path():
+    document = normalized()
+    document['contributors'][0]['email'] = 'str'
+
+    with pytest.raises(TypeError) as e:
+        NormalizedDocument(document)
+
+    assert 'root[\'contributors\'][\'email\']' in str(e.value)
+
+
+def test_trusted_documents_skip_lint():
+    with mock.patch.object(RawDocument, 'validate') as validate:
+        RawDocument({'doc': 'bar'}, trusted=True)
+        assert not validate.called
+
+    with pytest.raises(KeyError):
+        RawDocument({'doc': 'bar'})
+
+
+def test_documents_have_no_dict():
+    raw = RawDocument(dict(utils.RAW_DOC))
+
+    assert not hasattr(raw, '__dict__')
+    assert not hasattr(NormalizedDocument(normalized()), '__dict__')
+
+
+def test_pickling_skips_lint():
+    raw = RawDocument(dict(utils.RAW_DOC))
+    raw.parsed = object()
+    pickled = pickle.dumps(raw, pickle.HIGHEST_PROTOCOL)
+
+    with mock.patch.object(RawDocument, 'validate') as validate:
+        unpickled = pickle.loads(pickled)
+        assert not validate.called
+
+    assert isinstance(unpickled, RawDocument)
+    assert unpickled.attributes == raw.attributes
+    assert unpickled.parsed is None
+
+
+def test_keys_and_sources_are_interned():
+    first = NormalizedDocument(normalized())
+    second = pickle.loads(pickle.dumps(NormalizedDocument(normalized())))
+
+    assert second['source'] is first['source']
+    for key in second.attributes:
+        if key in ('title', 'contributors', 'id', 'properties', 'tags', 'timestamps'):
+            assert [k for k in first.attributes if k == key][0] is key
+    assert type(second['source']) is unicode
+
+
+def test_only_schema_keys_are_interned():
+    first = NormalizedDocument(normalized(properties={u'arbitrary': {u'nested': 1}}))
+    size = len(document._schema_keys)
+    second = NormalizedDocument(normalized(properties={u'arbitrary': {u'nested': 1}}))
+
+    assert len(document._schema_keys) == size
+    assert [k for k in first['contributors'][0] if k == 'given'][0] is \
+        [k for k in second['contributors'][0] if k == 'given'][0]
+    assert (unicode, u'arbitrary') not in document._schema_keys
+
+
+def test_interned_values_are_bounded(monkeypatch):
+    monkeypatch.setattr(document, '_interned', {})
+    monkeypatch.setattr(document, 'MAX_INTERNED', 1)
+
+    assert document.intern_string(u'first') is document.intern_string(u''.join([u'fir', u'st']))
+    assert document.intern_string(u'second') == u'second'
+    assert document._interned.keys() == [(unicode, u'first')]
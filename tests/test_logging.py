@@ -2,6 +2,7 @@ import mock
 import pytest
 
 from scrapi import events
+from scrapi.linter.document import RawDocument
 
 
 @pytest.fixture(autouse=True)
@@ -112,3 +113,72 @@ def test_logged_decorator_kwargs(mock_dispatch):
         mock.call('testing', events.STARTED, _index=None, test='baz', pika='chu', kwargs={'tota': 'dile'}),
         mock.call('testing', events.COMPLETED, _index=None, test='baz', pika='chu', kwargs={'tota': 'dile'}),
     ])
+
+
+def test_logged_decorator_positional_defaults(mock_dispatch):
+    @events.logged('testing')
+    def logged_func(name, created, days=1):
+        return 'share'
+
+    logged_func('baz', 'TIME')
+    logged_func('baz', 'TIME', 3)
+    mock_dispatch.assert_has_calls([
+        mock.call('testing', events.STARTED, _index=None, name='baz', created='TIME', days=1),
+        mock.call('testing', events.COMPLETED, _index=None, name='baz', created='TIME', days=1),
+        mock.call('testing', events.STARTED, _index=None, name='baz', created='TIME', days=3),
+        mock.call('testing', events.COMPLETED, _index=None, name='baz', created='TIME', days=3),
+    ])
+
+
+def test_logged_decorator_condenses_context(mock_dispatch):
+    @events.logged('testing')
+    def logged_func(raw_doc, body, processor, storage=None):
+        return 'share'
+
+    raw = RawDocument({'doc': 'x' * 1000, 'docID': u'someID', 'source': u'test', 'filetype': u'xml'})
+    logged_func(raw, 'x' * 1000, object(), storage={'claimed': True})
+
+    mock_dispatch.assert_any_call('testing', events.STARTED, _index=None,
+                                  docID=u'someID', storage={'claimed': True})
+
+
+def test_signature_is_inspected_once(mock_dispatch, monkeypatch):
+    @events.logged('testing')
+    def logged_func(test):
+        return test
+
+    monkeypatch.setattr(events.inspect, 'getargspec', mock.Mock(side_effect=AssertionError))
+    logged_func('foo')
+    logged_func('bar')
+
+    assert mock_dispatch.call_count == 4
+
+
+def test_disabled_events_short_circuit(mock_dispatch, monkeypatch):
+    monkeypatch.setattr(events.settings, 'USE_FLUENTD', False)
+
+    @events.logged('testing')
+    def logged_func(test):
+        raise events.Skip('For Reasons')
+
+    @events.creates_task('testing')
+    def creates_func(test):
+        return test
+
+    assert logged_func('foo') is None
+    assert creates_func('foo') == 'foo'
+    assert not mock_dispatch.called
+
+
+def test_stacked_decorators_share_the_signature(mock_dispatch):
+    raw = RawDocument({'doc': 'bar', 'docID': u'someID', 'source': u'test', 'filetype': u'xml'})
+
+    @events.creates_task('outer')
+    @events.creates_task('inner')
+    def spawn(raw, harvester_name):
+        return raw
+
+    spawn(raw, 'test')
+
+    mock_dispatch.assert_any_call('inner', events.CREATED, docID=u'someID', harvester_name='test')
+    mock_dispatch.assert_any_call('outer', events.CREATED, docID=u'someID', harvester_name='test')
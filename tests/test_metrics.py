@@ -0,0 +1,139 @@
+import os
+import json
+import time
+
+import mock
+import pytest
+
+from scrapi import metrics
+from scrapi import processing
+from scrapi.linter.document import RawDocument
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(metrics.settings, 'COLLECT_METRICS', True)
+    monkeypatch.setattr(metrics.settings, 'METRICS_DIRECTORY', None)
+    monkeypatch.setattr(metrics, 'registry', metrics.Registry())
+    return metrics.registry
+
+
+def test_histogram():
+    histogram = metrics.Histogram()
+    for seconds in [0.001, 0.2, 0.2, 3, 7200]:
+        histogram.observe(seconds)
+
+    assert histogram.count == 5
+    assert histogram.min == 0.001
+    assert histogram.max == 7200
+    assert histogram.percentile(50) == 0.25
+    assert histogram.percentile(99) == 7200
+
+    other = metrics.Histogram.from_dict(histogram.to_dict())
+    histogram.merge(other)
+
+    assert histogram.count == 10
+    assert sum(histogram.buckets) == 10
+    assert histogram.to_dict()['mean'] == other.total / 5
+
+
+def test_throughput():
+    throughput = metrics.Throughput()
+    throughput.add(10, now=100)
+    assert throughput.rate is None
+
+    throughput.add(10, now=110)
+    assert throughput.rate == 2
+
+    other = metrics.Throughput()
+    other.add(20, now=90)
+    throughput.merge(other)
+    assert throughput.rate == 2
+
+
+def test_record_timestamps(registry):
+    metrics.record_harvest('test', {
+        'harvestTaskCreated': '2015-01-01T00:00:00+00:00',
+        'harvestStarted': '2015-01-01T00:00:30+00:00',
+        'harvestFinished': '2015-01-01T00:10:30+00:00',
+    }, 50)
+    metrics.record_normalize('test', {
+        'normalizeTaskCreated': '2015-01-01T00:00:00+00:00',
+        'normalizeStarted': '2015-01-01T00:00:02+00:00',
+        'normalizeFinished': 'TIME',
+    })
+
+    snapshot = registry.snapshot()['test']
+
+    assert snapshot['harvestQueue']['latency']['total'] == 30
+    assert snapshot['harvest']['latency']['total'] == 600
+    assert snapshot['harvest']['throughput']['count'] == 50
+    assert snapshot['normalizeQueue']['latency']['total'] == 2
+    assert 'latency' not in snapshot['normalize']
+    assert snapshot['normalize']['throughput']['count'] == 1
+
+
+def test_disabled(registry, monkeypatch):
+    monkeypatch.setattr(metrics.settings, 'COLLECT_METRICS', False)
+
+    metrics.observe('test', 'harvest', 1)
+    metrics.count('test', 'harvest')
+    with metrics.timed('test', 'normalized.storage'):
+        pass
+
+    assert registry.snapshot() == {}
+
+
+def test_processors_are_timed(registry, monkeypatch):
+    processor = mock.Mock()
+    monkeypatch.setattr(processing.settings, 'NORMALIZED_PROCESSING', ['storage'])
+    monkeypatch.setattr(processing, 'get_processor', lambda name: processor)
+
+    raw = RawDocument({'doc': 'bar', 'docID': u'foo', 'source': u'test', 'filetype': u'xml'})
+    processing.process_normalized(raw, mock.Mock(), {})
+
+    stage = registry.snapshot()['test']['normalized.storage']
+    assert stage['latency']['count'] == 1
+    assert stage['throughput']['count'] == 1
+
+
+def test_load_combines_saved_snapshots(registry, monkeypatch, tmpdir):
+    monkeypatch.setattr(metrics.settings, 'METRICS_DIRECTORY', str(tmpdir))
+
+    worker = metrics.Registry()
+    worker.observe('test', 'normalize', 1)
+    worker.save(str(tmpdir.join('worker-1.json')))
+    tmpdir.join('garbage.json').write('{')
+
+    metrics.observe('test', 'normalize', 3)
+
+    combined = metrics.load().snapshot()
+    assert combined['test']['normalize']['latency']['count'] == 2
+    assert combined['test']['normalize']['latency']['total'] == 4
+
+
+def test_saves_periodically(registry, monkeypatch, tmpdir):
+    monkeypatch.setattr(metrics.settings, 'METRICS_DIRECTORY', str(tmpdir))
+    monkeypatch.setattr(metrics.settings, 'METRICS_SAVE_INTERVAL', 0)
+
+    metrics.observe('test', 'harvest', 1)
+
+    saved, = tmpdir.listdir()
+    assert json.loads(saved.read())['test']['harvest']['latency']['count'] == 1
+
+
+def test_save_prunes_old_snapshots(registry, monkeypatch, tmpdir):
+    monkeypatch.setattr(metrics.settings, 'METRICS_DIRECTORY', str(tmpdir))
+    monkeypatch.setattr(metrics.settings, 'METRICS_MAX_AGE', 60)
+
+    for name in ['exited.json', 'recent.json', 'other.txt']:
+        tmpdir.join(name).write('{}')
+    old = time.time() - 120
+    os.utime(str(tmpdir.join('exited.json')), (old, old))
+    os.utime(str(tmpdir.join('other.txt')), (old, old))
+
+    metrics.save()
+
+    assert sorted(path.basename for path in tmpdir.listdir()) == sorted(
+        ['recent.json', 'other.txt', os.path.basename(metrics.snapshot_path())]
+    )
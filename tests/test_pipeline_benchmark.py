@@ -0,0 +1,103 @@
+import json
+import cPickle
+import multiprocessing
+from base64 import b64encode
+
+import mock
+import pytest
+
+from scrapi import pipeline_benchmark
+from scrapi.linter.document import RawDocument
+
+
+def test_synthetic_corpus():
+    corpus = pipeline_benchmark.synthetic_corpus(5, doc_size=100)
+
+    assert len(corpus.harvest()) == 5
+    assert list(corpus.iter_harvest()) == corpus.raw_docs
+    assert all(len(raw['doc']) == 100 for raw in corpus.raw_docs)
+    assert corpus.expected() == 5
+    assert corpus.normalize(corpus.raw_docs[3])['id']['serviceID'] == u'3'
+
+
+def test_recorded_corpus_repeats_documents(monkeypatch):
+    recorded = [
+        RawDocument({'doc': 'doc', 'docID': unicode(i), 'source': u'test', 'filetype': u'xml'})
+        for i in range(2)
+    ]
+    harvester = mock.Mock()
+    harvester.harvest.return_value = recorded
+    monkeypatch.setattr(pipeline_benchmark.benchmark, 'latest_cassette', lambda name: 'cassette.yml')
+    monkeypatch.setattr(pipeline_benchmark.benchmark.replay, 'use_cassette', mock.MagicMock())
+    monkeypatch.setattr(pipeline_benchmark.util, 'import_harvester', lambda name: harvester)
+
+    corpus = pipeline_benchmark.recorded_corpus('test', 5)
+
+    assert [raw['docID'] for raw in corpus.raw_docs] == [u'0', u'1', u'0-1', u'1-1', u'0-2']
+    assert corpus.normalize is harvester.normalize
+
+
+def test_recorded_corpus_needs_a_recording(monkeypatch):
+    monkeypatch.setattr(pipeline_benchmark.benchmark, 'latest_cassette', lambda name: None)
+
+    with pytest.raises(ValueError):
+        pipeline_benchmark.recorded_corpus('test', 5)
+
+
+def test_broker_messages(tmpdir):
+    for i, task in enumerate(['scrapi.tasks.normalize', 'scrapi.tasks.normalize', 'scrapi.tasks.harvest']):
+        body = b64encode(cPickle.dumps({'task': task, 'args': [i]}))
+        tmpdir.join('{}.msg'.format(i)).write(json.dumps({'body': body}))
+    tmpdir.join('broken.msg').write('nope')
+
+    messages = pipeline_benchmark.broker_messages(str(tmpdir))
+
+    assert messages['scrapi.tasks.normalize']['count'] == 2
+    assert messages['scrapi.tasks.harvest']['count'] == 1
+    assert messages['unknown'] == {'count': 1, 'bytes': 4}
+    assert messages['scrapi.tasks.harvest']['bytes'] == tmpdir.join('2.msg').size()
+
+
+def test_overridden():
+    obj = mock.Mock(spec=['kept'])
+    obj.kept = 1
+
+    with pipeline_benchmark.overridden(obj, {'kept': 2, 'added': 3}):
+        assert obj.kept == 2
+        assert obj.added == 3
+
+    assert obj.kept == 1
+    assert not hasattr(obj, 'added')
+
+
+def test_standin_processor(monkeypatch):
+    sleep = mock.Mock()
+    monkeypatch.setattr(pipeline_benchmark.time, 'sleep', sleep)
+    monkeypatch.setattr(pipeline_benchmark.settings, 'STANDIN_LATENCY', 0.5)
+    monkeypatch.setattr(pipeline_benchmark.settings, 'STANDIN_FLUSH_LATENCY', 2)
+    monkeypatch.setattr(pipeline_benchmark.StandInProcessor, 'counters', {
+        'raw': multiprocessing.Value('l', 0),
+        'normalized': multiprocessing.Value('l', 0),
+    })
+
+    processor = pipeline_benchmark.StandInProcessor()
+    processor.process_raw(None)
+    processor.process_raw(None)
+    processor.process_normalized(None, None)
+    processor.flush()
+
+    assert processor.counters['raw'].value == 2
+    assert processor.counters['normalized'].value == 1
+    assert sleep.call_args_list == [mock.call(0.5)] * 3 + [mock.call(2)]
+
+
+def test_configure_keeps_the_archive_in_the_benchmark(monkeypatch, tmpdir):
+    monkeypatch.setattr(pipeline_benchmark.settings, 'ARCHIVE_CATALOG', 'catalog.sqlite')
+
+    _, _, scrapi_settings = pipeline_benchmark.configure(str(tmpdir))
+
+    assert scrapi_settings['ARCHIVE_DIRECTORY'].startswith(str(tmpdir))
+    assert scrapi_settings['ARCHIVE_CATALOG'].startswith(str(tmpdir))
+
+    monkeypatch.setattr(pipeline_benchmark.settings, 'ARCHIVE_CATALOG', None)
+    assert pipeline_benchmark.configure(str(tmpdir))[2]['ARCHIVE_CATALOG'] is None
@@ -57,3 +57,19 @@ def test_raw_calls_all_throwing(get_processor):
 def test_raises_on_bad_processor():
     with pytest.raises(NotImplementedError):
         processing.get_processor("Baby, You're never there.")
+
+
+def test_get_processor_reuses_instances():
+    processing.reset_processors()
+
+    processor = processing.get_processor('storage')
+
+    assert processing.get_processor('storage') is processor
+
+
+def test_reset_processors():
+    processor = processing.get_processor('storage')
+
+    processing.reset_processors()
+
+    assert processing.get_processor('storage') is not processor
@@ -0,0 +1,76 @@
+import mock
+import pytest
+
+from scrapi import tasks
+from scrapi import profiling
+from scrapi.linter.document import RawDocument
+
+
+@pytest.fixture(autouse=True)
+def profiles(request, monkeypatch, tmpdir):
+    monkeypatch.setattr(profiling.settings, 'PROFILE_TASKS', True)
+    monkeypatch.setattr(profiling.settings, 'PROFILE_SAMPLE_RATE', 1)
+    monkeypatch.setattr(profiling.settings, 'PROFILE_SAVE_INTERVAL', 0)
+    monkeypatch.setattr(profiling.settings, 'RECORD_DIRECTORY', str(tmpdir))
+    profiling.reset()
+    request.addfinalizer(profiling.reset)
+    return tmpdir.join('profiles')
+
+
+@pytest.fixture
+def raw_doc():
+    return RawDocument({'doc': 'bar', 'docID': u'foo', 'source': u'test', 'filetype': u'xml'})
+
+
+def test_harvester_of(raw_doc):
+    assert profiling.harvester_of(('test', 'TIME'), {}) == 'test'
+    assert profiling.harvester_of((raw_doc,), {}) == 'test'
+    assert profiling.harvester_of(([raw_doc], 'other'), {}) == 'test'
+    assert profiling.harvester_of((), {'harvester_name': 'named'}) == 'named'
+    assert profiling.harvester_of((True,), {}) == profiling.UNKNOWN
+
+
+def test_profiles_are_saved_and_merged(profiles, raw_doc, monkeypatch):
+    monkeypatch.setattr(tasks.processing, 'process_raw', mock.Mock())
+
+    tasks.process_raw.delay(raw_doc)
+    tasks.process_raw.delay(raw_doc)
+
+    saved, = profiles.join('scrapi.tasks.process_raw', 'test').listdir()
+    assert saved.basename.endswith('.prof')
+
+    stats = profiling.merge(task='scrapi.tasks.process_raw', harvester='test')
+    assert any(name == 'process_raw' for _, _, name in stats.stats)
+    assert profiling.merge(harvester='missing') is None
+
+
+def test_unsampled_tasks_are_not_profiled(profiles, monkeypatch):
+    monkeypatch.setattr(profiling.settings, 'PROFILE_SAMPLE_RATE', 0)
+
+    profiling.task_started('id', mock.Mock(), ('test',), {})
+    profiling.task_finished('id')
+
+    assert profiling._stats == {}
+    assert not profiles.check()
+
+
+def test_nested_tasks_are_not_profiled(profiles):
+    task = mock.Mock()
+    task.name = 'outer'
+
+    profiling.task_started('outer', task, ('test',), {})
+    profiling.task_started('inner', task, ('test',), {})
+    assert list(profiling._running) == ['outer']
+
+    profiling.task_finished('inner')
+    profiling.task_finished('outer')
+
+    assert list(profiling._stats) == [('outer', 'test')]
+
+
+def test_disabled(profiles, monkeypatch):
+    monkeypatch.setattr(profiling.settings, 'PROFILE_TASKS', False)
+
+    profiling.task_started('id', mock.Mock(), ('test',), {})
+
+    assert profiling._running == {}
@@ -0,0 +1,104 @@
+import mock
+import pytest
+import requests as _requests
+
+from scrapi import settings
+from scrapi import requests
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    sleep = mock.Mock()
+    monkeypatch.setattr('scrapi.requests.time.sleep', sleep)
+    return sleep
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = mock.Mock()
+    monkeypatch.setattr('scrapi.requests.get_session', lambda url: session)
+    return session
+
+
+def response(status_code, headers=None):
+    resp = _requests.Response()
+    resp.status_code = status_code
+    resp.headers.update(headers or {})
+    return resp
+
+
+def test_sessions_are_pooled_per_host():
+    assert requests.get_session('http://a.com/foo') is requests.get_session('http://a.com/bar')
+    assert requests.get_session('http://a.com/foo') is not requests.get_session('http://b.com/foo')
+
+
+def test_sessions_are_not_shared_across_processes(monkeypatch):
+    session = requests.get_session('http://a.com/')
+    monkeypatch.setattr('scrapi.requests.os.getpid', lambda: -1)
+
+    assert requests.get_session('http://a.com/') is not session
+
+
+def test_default_timeout(session):
+    session.request.return_value = response(200)
+
+    requests.get('http://a.com/')
+    requests.get('http://a.com/', timeout=5)
+
+    assert session.request.call_args_list == [
+        mock.call('GET', 'http://a.com/', timeout=settings.REQUESTS_TIMEOUT),
+        mock.call('GET', 'http://a.com/', timeout=5),
+    ]
+
+
+def test_retries_with_backoff(session, no_sleep, monkeypatch):
+    monkeypatch.setattr(settings, 'REQUESTS_BACKOFF', 1)
+    session.request.side_effect = [_requests.exceptions.ConnectionError(), response(503), response(200)]
+
+    assert requests.get('http://a.com/').status_code == 200
+    assert no_sleep.call_args_list == [mock.call(1), mock.call(2)]
+
+
+def test_honors_retry_after(session, no_sleep):
+    session.request.side_effect = [response(429, {'Retry-After': '7'}), response(200)]
+
+    assert requests.get('http://a.com/').status_code == 200
+    no_sleep.assert_called_once_with(7)
+
+
+def test_honors_zero_retry_after(session, no_sleep, monkeypatch):
+    monkeypatch.setattr(settings, 'REQUESTS_BACKOFF', 1)
+    session.request.side_effect = [response(503, {'Retry-After': '0'}), response(200)]
+
+    assert requests.get('http://a.com/').status_code == 200
+    no_sleep.assert_called_once_with(0)
+
+
+def test_gives_up(session, monkeypatch):
+    monkeypatch.setattr(settings, 'REQUESTS_RETRIES', 2)
+    session.request.return_value = response(500)
+
+    assert requests.get('http://a.com/').status_code == 500
+    assert session.request.call_count == 3
+
+    session.request.side_effect = _requests.exceptions.ConnectionError()
+    with pytest.raises(_requests.exceptions.ConnectionError):
+        requests.get('http://a.com/')
+
+
+def test_does_not_retry_client_errors(session):
+    session.request.return_value = response(404)
+
+    assert requests.get('http://a.com/').status_code == 404
+    assert session.request.call_count == 1
+
+
+def test_recording_bypasses_pool(session, monkeypatch):
+    mock_request = mock.Mock(return_value=response(200))
+    monkeypatch.setattr(settings, 'RECORD_HTTP_TRANSACTIONS', True)
+    monkeypatch.setattr('scrapi.requests.requests.request', mock_request)
+
+    requests.get('http://a.com/')
+
+    assert mock_request.called
+    assert not session.request.called
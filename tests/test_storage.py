@@ -0,0 +1,210 @@
+import mock
+import pytz
+import utils
+import pytest
+from base64 import b64decode
+from datetime import datetime
+
+from scrapi import settings
+from scrapi.util.storage.disk import DiskStorage
+from scrapi.util.storage.segment import SegmentStorage
+from scrapi.linter.document import RawDocument, RawDocumentClaim, NormalizedDocument
+
+
+@pytest.fixture(params=[DiskStorage, SegmentStorage])
+def store(request, tmpdir, monkeypatch):
+    monkeypatch.setattr(settings, 'ARCHIVE_DIRECTORY', str(tmpdir) + '/')
+    monkeypatch.setitem(settings.MANIFESTS, 'test', {'fileFormat': 'xml'})
+    return request.param()
+
+
+@pytest.fixture
+def segments(tmpdir, monkeypatch):
+    monkeypatch.setattr(settings, 'ARCHIVE_DIRECTORY', str(tmpdir) + '/')
+    monkeypatch.setitem(settings.MANIFESTS, 'test', {'fileFormat': 'xml'})
+    return SegmentStorage()
+
+
+@pytest.fixture
+def raw_doc():
+    return RawDocument({
+        'doc': '<xml>bar</xml>',
+        'docID': u'foo',
+        'source': u'test',
+        'filetype': u'xml',
+        'timestamps': {'harvestFinished': '2015-03-01T00:00:00+00:00'}
+    })
+
+
+def test_claim_check_stores_raw(store, raw_doc):
+    claim = store.claim_check(raw_doc)
+
+    assert isinstance(claim, RawDocumentClaim)
+    assert claim.get('doc') is None
+    assert claim['docID'] == raw_doc['docID']
+    assert list(store.iter_raws('test')) != []
+
+
+def test_redeem_returns_raw(store, raw_doc):
+    redeemed = store.redeem(store.claim_check(raw_doc))
+
+    assert isinstance(redeemed, RawDocument)
+    assert redeemed.attributes == raw_doc.attributes
+
+
+def test_store_normalized_skips_unchanged(store, raw_doc, monkeypatch):
+    normalized = NormalizedDocument(dict(utils.RECORD, source=u'tests'))
+    store.store_normalized(raw_doc, normalized)
+
+    mock_store = mock.Mock()
+    monkeypatch.setattr(store, '_store', mock_store)
+
+    normalized['timestamps'] = {'normalizeFinished': 'TIME'}
+    store.store_normalized(raw_doc, normalized, overwrite=True)
+    assert not mock_store.called
+
+    normalized['title'] = u'A new title'
+    store.store_normalized(raw_doc, normalized, overwrite=True)
+    assert mock_store.called
+
+
+def test_iter_raws_skips_normalized(store, raw_doc):
+    store.store_raw(raw_doc)
+    other = RawDocument(dict(raw_doc.attributes, docID=u'bar'))
+    store.store_raw(other)
+    store.store_normalized(other, NormalizedDocument(dict(utils.RECORD, source=u'tests')))
+
+    raws = list(store.iter_raws('test'))
+    assert len(raws) == 1
+    assert store.get_as_string(raws[0]) == raw_doc['doc']
+
+    assert len(list(store.iter_raws('test', include_normalized=True))) == 2
+
+
+def test_store_refuses_overwrite(store, raw_doc):
+    store.store_raw(raw_doc)
+
+    with pytest.raises(Exception):
+        store.store_raw(raw_doc)
+
+
+def test_segments_pack_documents(segments, raw_doc, tmpdir):
+    for doc_id in (u'foo', u'bar', u'baz'):
+        segments.store_raw(RawDocument(dict(raw_doc.attributes, docID=doc_id)))
+
+    source_dir = tmpdir.join('test')
+    assert source_dir.listdir() == [source_dir.join('segments')]
+    assert len(source_dir.join('segments').listdir()) == 2  # The index and one segment
+
+
+def test_segments_roll_over(segments, raw_doc, tmpdir, monkeypatch):
+    monkeypatch.setattr(settings, 'SEGMENT_SIZE', 1)
+
+    for doc_id in (u'foo', u'bar'):
+        segments.store_raw(RawDocument(dict(raw_doc.attributes, docID=doc_id)))
+
+    assert tmpdir.join('test', 'segments', '00000001.seg').check()
+    assert [segments.get_as_string(path) for path in segments.iter_raws('test')] == [raw_doc['doc']] * 2
+
+
+def test_segments_overwrite_reads_latest(segments):
+    path = settings.ARCHIVE_DIRECTORY + 'test/foo/manifest.json'
+    segments._store('{"a": 1}', path)
+    segments._store('{"a": 2}', path, overwrite=True)
+
+    assert segments.get_as_json(path) == {'a': 2}
+
+
+def test_segments_see_other_writers(segments, raw_doc):
+    reader = SegmentStorage()
+    assert list(reader.iter_raws('test')) == []
+
+    segments.store_raw(raw_doc)
+
+    path, = reader.iter_raws('test')
+    assert reader.get_as_string(path) == raw_doc['doc']
+
+
+def test_segments_see_other_writers_overwrite(segments):
+    path = settings.ARCHIVE_DIRECTORY + 'test/foo/manifest.json'
+    reader = SegmentStorage()
+    segments._store('{"a": 1}', path)
+    assert reader.get_as_json(path) == {'a': 1}
+
+    segments._store('{"a": 2}', path, overwrite=True)
+
+    assert reader.get_as_json(path) == {'a': 2}
+
+
+@pytest.mark.parametrize('path', ['test/foo/raw.xml', 'test', 'test/', '', '../test/foo'])
+def test_segments_missing_raises_ioerror(segments, path):
+    with pytest.raises(IOError):
+        segments.get_as_string(settings.ARCHIVE_DIRECTORY + path)
+
+
+@pytest.mark.parametrize('method', ['zlib', 'gzip'])
+def test_compressed_round_trip(store, raw_doc, monkeypatch, method):
+    monkeypatch.setattr(settings, 'STORAGE_COMPRESSION', method)
+    store.store_raw(raw_doc)
+
+    path, = store.iter_raws('test')
+    assert store._read(path) != raw_doc['doc']
+    assert store.get_as_string(path) == raw_doc['doc']
+    assert store.redeem(store.claim_check(RawDocument(dict(raw_doc.attributes, docID=u'bar'))))['doc'] == raw_doc['doc']
+
+
+def test_reads_mixed_archives(store, raw_doc, monkeypatch):
+    store.store_raw(raw_doc)
+
+    monkeypatch.setattr(settings, 'STORAGE_COMPRESSION', 'zlib')
+    store.store_raw(RawDocument(dict(raw_doc.attributes, docID=u'bar')))
+
+    assert [store.get_as_string(path) for path in store.iter_raws('test')] == [raw_doc['doc']] * 2
+
+
+@pytest.fixture
+def catalog(tmpdir, monkeypatch):
+    monkeypatch.setattr(settings, 'ARCHIVE_CATALOG', str(tmpdir.join('catalog.sqlite')))
+
+
+def test_catalog_tracks_stored_documents(store, raw_doc, catalog, monkeypatch):
+    store.store_raw(raw_doc)
+    other = RawDocument(dict(raw_doc.attributes, docID=u'bar'))
+    store.store_raw(other)
+    store.store_normalized(other, NormalizedDocument(dict(utils.RECORD, source=u'tests')))
+
+    # Answered by the catalog alone
+    monkeypatch.setattr(store, '_scan', mock.Mock(side_effect=AssertionError))
+
+    raws = list(store.iter_raws('test'))
+    assert raws == [store._build_path(raw_doc) + '/raw.xml']
+    assert len(list(store.iter_raws('test', include_normalized=True))) == 2
+
+
+@pytest.mark.parametrize('use_catalog', [True, False])
+def test_iter_raws_since(store, raw_doc, tmpdir, monkeypatch, use_catalog):
+    if use_catalog:
+        monkeypatch.setattr(settings, 'ARCHIVE_CATALOG', str(tmpdir.join('catalog.sqlite')))
+
+    store.store_raw(raw_doc)
+    store.store_raw(RawDocument(dict(
+        raw_doc.attributes, docID=u'bar', timestamps={'harvestFinished': '2015-03-03T00:00:00+00:00'}
+    )))
+
+    since = datetime(2015, 3, 2, tzinfo=pytz.utc)
+    assert [b64decode(path.split('/')[-3]) for path in store.iter_raws('test', since=since)] == ['bar']
+
+
+def test_rebuild_catalog(store, raw_doc, tmpdir, monkeypatch):
+    store.store_raw(raw_doc)
+    other = RawDocument(dict(raw_doc.attributes, docID=u'bar'))
+    store.store_raw(other)
+    store.store_normalized(other, NormalizedDocument(dict(utils.RECORD, source=u'tests')))
+
+    monkeypatch.setattr(settings, 'ARCHIVE_CATALOG', str(tmpdir.join('catalog.sqlite')))
+    assert list(store.iter_raws('test', include_normalized=True)) == []
+
+    store.rebuild_catalog('test')
+
+    assert [b64decode(path.split('/')[-3]) for path in store.iter_raws('test')] == ['foo']
+    assert len(list(store.iter_raws('test', include_normalized=True))) == 2
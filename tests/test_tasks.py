@@ -1,9 +1,13 @@
 import mock
+import pytz
 import pytest
+from datetime import datetime, timedelta
+from contextlib import contextmanager
 
 from scrapi import tasks
 from scrapi import settings
 from scrapi.linter import RawDocument
+from scrapi.linter.document import RawDocumentClaim
 
 
 settings.USE_FLUENT = False
@@ -135,3 +139,229 @@ def test_process_norm_calls(raw_doc, monkeypatch):
     tasks.process_normalized(raw_doc, raw_doc)
 
     pmock.assert_called_once_with(raw_doc, raw_doc, {})
+
+
+def test_run_harvester_streams(monkeypatch):
+    mock_harvest = mock.MagicMock()
+    mock_stream = mock.MagicMock()
+
+    monkeypatch.setattr('scrapi.tasks.harvest', mock_harvest)
+    monkeypatch.setattr('scrapi.tasks.stream_harvest', mock_stream)
+    monkeypatch.setattr(settings, 'STREAM_HARVESTS', True)
+
+    tasks.run_harvester('test', days_back=10)
+
+    assert not mock_harvest.si.called
+    mock_stream.delay.assert_called_once_with('test', 'TIME', days_back=10)
+
+
+@pytest.mark.usefixtures('harvester')
+def test_stream_harvest_normalizes_in_chunks(harvester, raw_docs, monkeypatch):
+    mock_begin_norm = mock.MagicMock()
+
+    monkeypatch.setattr('scrapi.tasks.begin_normalization', mock_begin_norm)
+    monkeypatch.setattr(settings, 'HARVEST_CHUNK_SIZE', 5)
+    harvester.iter_harvest.return_value = iter(raw_docs)
+
+    tasks.stream_harvest('test', 'TIME', days_back=10)
+
+    harvester.iter_harvest.assert_called_once_with(days_back=10)
+    assert mock_begin_norm.call_count == 3
+
+    chunks = [call[0][0][0] for call in mock_begin_norm.call_args_list]
+    assert [len(chunk) for chunk in chunks] == [5, 5, 1]
+    assert sum(chunks, []) == raw_docs
+
+    for call in mock_begin_norm.call_args_list:
+        (_, timestamps), harvester_name = call[0]
+        assert harvester_name == 'test'
+        assert set(timestamps.keys()) == {'harvestFinished', 'harvestTaskCreated', 'harvestStarted'}
+
+
+@pytest.mark.usefixtures('harvester')
+def test_stream_harvest_times_each_chunk(harvester, raw_docs, monkeypatch):
+    mock_record = mock.MagicMock()
+    times = iter(['started', 'first', 'second', 'third'])
+
+    monkeypatch.setattr('scrapi.tasks.begin_normalization', mock.MagicMock())
+    monkeypatch.setattr('scrapi.tasks.metrics.record_harvest', mock_record)
+    monkeypatch.setattr('scrapi.tasks.timestamp', lambda: next(times))
+    monkeypatch.setattr(settings, 'HARVEST_CHUNK_SIZE', 5)
+    harvester.iter_harvest.return_value = iter(raw_docs)
+
+    tasks.stream_harvest('test', 'created')
+
+    assert [call[0][1] for call in mock_record.call_args_list] == [
+        {'harvestTaskCreated': 'created', 'harvestStarted': 'started', 'harvestFinished': 'first'},
+        {'harvestStarted': 'first', 'harvestFinished': 'second'},
+        {'harvestStarted': 'second', 'harvestFinished': 'third'},
+    ]
+
+
+@pytest.mark.usefixtures('harvester')
+def test_stream_harvest_records_only_the_harvest(harvester, raw_docs, monkeypatch):
+    recording = []
+    normalized_while_recording = []
+
+    @contextmanager
+    def maybe_recorded(name):
+        recording.append(name)
+        yield
+        recording.pop()
+
+    monkeypatch.setattr(settings, 'RECORD_HTTP_TRANSACTIONS', True)
+    monkeypatch.setattr('scrapi.tasks.util.maybe_recorded', maybe_recorded)
+    monkeypatch.setattr('scrapi.tasks.begin_normalization', lambda *args: normalized_while_recording.append(bool(recording)))
+    harvester.iter_harvest.side_effect = lambda days_back: (raw for raw in raw_docs if recording)
+
+    tasks.stream_harvest('test', 'TIME')
+
+    assert normalized_while_recording == [False]
+
+
+@pytest.mark.usefixtures('harvester')
+def test_harvest_checks_in_raws(harvester, raw_docs, monkeypatch):
+    mock_store = mock.MagicMock()
+    mock_store.claim_check.side_effect = lambda raw: 'claim ' + raw['docID']
+
+    monkeypatch.setattr('scrapi.tasks.store', mock_store)
+    monkeypatch.setattr(settings, 'CLAIM_CHECK_RAW', True)
+    harvester.harvest.return_value = raw_docs
+
+    claims, timestamps = tasks.harvest('test', 'TIME')
+
+    assert claims == ['claim ' + raw['docID'] for raw in raw_docs]
+    for raw in raw_docs:
+        assert raw['timestamps'] == timestamps
+        mock_store.claim_check.assert_any_call(raw)
+
+
+@pytest.mark.usefixtures('harvester')
+def test_normalize_redeems_claims(harvester, raw_doc, monkeypatch):
+    mock_store = mock.MagicMock()
+    claim = RawDocumentClaim({'docID': u'foo', 'source': u'test', 'filetype': u'xml'})
+    raw_doc['timestamps'] = {}
+    mock_store.redeem.return_value = raw_doc
+
+    monkeypatch.setattr('scrapi.tasks.store', mock_store)
+
+    tasks.normalize(claim, 'test')
+
+    mock_store.redeem.assert_called_once_with(claim)
+    harvester.normalize.assert_called_once_with(raw_doc)
+
+
+def test_process_raw_redeems_claims(raw_doc, monkeypatch):
+    pmock = mock.Mock()
+    mock_store = mock.MagicMock()
+    claim = RawDocumentClaim({'docID': u'foo', 'source': u'test', 'filetype': u'xml'})
+    mock_store.redeem.return_value = raw_doc
+
+    monkeypatch.setattr('scrapi.tasks.store', mock_store)
+    monkeypatch.setattr('scrapi.tasks.processing.process_raw', pmock)
+    monkeypatch.setattr(settings, 'RAW_PROCESSING', ['storage', 'cassandra'])
+
+    tasks.process_raw(claim)
+
+    pmock.assert_called_once_with(raw_doc, {'storage': {'claimed': True}})
+
+
+def test_process_raw_leaves_claims_for_storage(monkeypatch):
+    pmock = mock.Mock()
+    mock_store = mock.MagicMock()
+    claim = RawDocumentClaim({'docID': u'foo', 'source': u'test', 'filetype': u'xml'})
+
+    monkeypatch.setattr('scrapi.tasks.store', mock_store)
+    monkeypatch.setattr('scrapi.tasks.processing.process_raw', pmock)
+    monkeypatch.setattr(settings, 'RAW_PROCESSING', ['storage'])
+
+    tasks.process_raw(claim)
+
+    assert not mock_store.redeem.called
+    pmock.assert_called_once_with(claim, {'storage': {'claimed': True}})
+
+
+def test_begin_normalize_batches(raw_docs, monkeypatch):
+    mock_norm = mock.MagicMock()
+    mock_praw = mock.MagicMock()
+    mock_pnorm = mock.MagicMock()
+
+    monkeypatch.setattr('scrapi.tasks.normalize_batch', mock_norm)
+    monkeypatch.setattr('scrapi.tasks.process_raw_batch', mock_praw)
+    monkeypatch.setattr('scrapi.tasks.process_normalized_batch', mock_pnorm)
+    monkeypatch.setattr(settings, 'NORMALIZE_BATCH_SIZE', 5)
+
+    tasks.begin_normalization((raw_docs, {}), 'test')
+
+    assert mock_norm.si.call_count == 3
+    assert mock_pnorm.s.call_count == 3
+    assert mock_praw.delay.call_count == 3
+
+    mock_norm.si.assert_any_call(raw_docs[:5], 'test')
+    mock_pnorm.s.assert_any_call(raw_docs[5:10])
+    mock_praw.delay.assert_any_call(raw_docs[10:])
+
+    for raw in raw_docs:
+        assert 'normalizeTaskCreated' in raw['timestamps']
+
+
+@pytest.mark.parametrize('use_fluentd', [True, False])
+def test_spawn_batch_dispatches_only_with_fluentd(raw_docs, monkeypatch, use_fluentd):
+    mock_dispatch = mock.Mock()
+    monkeypatch.setattr('scrapi.tasks.events.dispatch', mock_dispatch)
+    monkeypatch.setattr('scrapi.tasks.normalize_batch', mock.MagicMock())
+    monkeypatch.setattr('scrapi.tasks.process_raw_batch', mock.MagicMock())
+    monkeypatch.setattr('scrapi.tasks.process_normalized_batch', mock.MagicMock())
+    monkeypatch.setattr(settings, 'USE_FLUENTD', use_fluentd)
+
+    tasks.spawn_batch(raw_docs, {}, 'test')
+
+    assert mock_dispatch.call_count == (2 * len(raw_docs) if use_fluentd else 0)
+
+
+def test_normalize_batch_isolates_failures(raw_docs, monkeypatch):
+    def normalize(raw_doc, harvester_name):
+        if raw_doc['docID'] == u'3':
+            raise ValueError('bad document')
+        return raw_doc['docID']
+
+    mock_norm = mock.MagicMock(side_effect=normalize)
+    monkeypatch.setattr('scrapi.tasks.normalize', mock_norm)
+
+    normalized = tasks.normalize_batch(raw_docs, 'test')
+
+    assert len(normalized) == len(raw_docs)
+    assert normalized[3] is None
+    assert normalized[4] == u'4'
+
+
+def test_process_batches_call_each(raw_docs, monkeypatch):
+    mock_praw = mock.MagicMock(side_effect=ValueError)
+    mock_pnorm = mock.MagicMock(side_effect=ValueError)
+
+    monkeypatch.setattr('scrapi.tasks.process_raw', mock_praw)
+    monkeypatch.setattr('scrapi.tasks.process_normalized', mock_pnorm)
+
+    tasks.process_raw_batch(raw_docs, storage={'overwrite': True})
+    tasks.process_normalized_batch(raw_docs, raw_docs)
+
+    assert mock_praw.call_count == len(raw_docs)
+    assert mock_pnorm.call_count == len(raw_docs)
+
+    for raw in raw_docs:
+        mock_praw.assert_any_call(raw, storage={'overwrite': True}, cassandra={'wait': False})
+        mock_pnorm.assert_any_call(raw, raw, cassandra={'wait': False})
+
+
+def test_check_archive_passes_since(monkeypatch):
+    mock_store = mock.MagicMock()
+    mock_store.iter_raws.return_value = []
+    monkeypatch.setattr('scrapi.tasks.store', mock_store)
+    monkeypatch.setitem(settings.MANIFESTS, 'test', {'fileFormat': 'xml'})
+
+    tasks.check_archive('test', False, days_back=2)
+
+    (source,), kwargs = mock_store.iter_raws.call_args
+    assert source == 'test'
+    assert kwargs['include_normalized'] is False
+    assert abs(datetime.now(pytz.utc) - kwargs['since'] - timedelta(days=2)) < timedelta(minutes=1)
@@ -0,0 +1,77 @@
+import utils
+
+from scrapi import util
+from scrapi.linter.document import RawDocument, NormalizedDocument
+
+
+def test_chunked():
+    assert list(util.chunked(xrange(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(util.chunked([], 2)) == []
+
+
+def test_raw_digest_uses_doc():
+    raw = RawDocument(dict(utils.RAW_DOC))
+    other = RawDocument(dict(utils.RAW_DOC, timestamps={}, docID=u'otherID'))
+
+    assert util.content_digest(raw) == util.content_digest(other)
+    assert util.content_digest(raw) != util.content_digest(RawDocument(dict(utils.RAW_DOC, doc='{"a": 1}')))
+
+
+def test_normalized_digest_ignores_timestamps():
+    normalized = NormalizedDocument(dict(utils.RECORD, source=u'tests'))
+    digest = util.content_digest(normalized)
+
+    normalized['timestamps'] = {'normalizeFinished': 'TIME'}
+    normalized['raw'] = 'http://example.com/raw.json'
+    assert util.content_digest(normalized) == digest
+
+    normalized['title'] = u'Another title'
+    assert util.content_digest(normalized) != digest
+
+
+def test_digest_of_dict():
+    normalized = NormalizedDocument(dict(utils.RECORD, source=u'tests'))
+
+    assert util.content_digest(normalized) == util.content_digest(dict(utils.RECORD, source=u'tests'))
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = util.LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.info() == {'hits': 3, 'misses': 1, 'size': 2, 'maxsize': 2}
+
+
+def test_parse_contributor(monkeypatch):
+    monkeypatch.setattr(util, 'name_cache', util.LRUCache(10))
+
+    contributor = util.parse_contributor(u'Dr. Jane Q. Doe Jr.', orcid=u'0000')
+    assert contributor == {
+        'prefix': u'Dr.',
+        'given': u'Jane',
+        'middle': u'Q.',
+        'family': u'Doe',
+        'suffix': u'Jr.',
+        'email': '',
+        'ORCID': u'0000'
+    }
+
+    contributor['family'] = u'Changed'
+    assert util.parse_contributor('Dr. Jane Q. Doe Jr.')['family'] == u'Doe'
+    assert util.name_cache.info()['hits'] == 1
+
+
+def test_name_cache_clear():
+    util.name_cache.put('key', 'value')
+    util.name_cache.get('key')
+    util.name_cache.clear()
+
+    assert util.name_cache.info()['size'] == 0
+    assert util.name_cache.info()['hits'] == 0